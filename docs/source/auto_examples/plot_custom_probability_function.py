@@ -54,7 +54,7 @@ patterns = [
 from pyampute import MultivariateAmputation
 
 ma = MultivariateAmputation(prop=my_prop, patterns=patterns)
-incomplete_data = ma.fit_transform(X)
+incomplete_data, diagnostics = ma.fit(X).transform(X, return_diagnostics=True)
 
 
 # %%
@@ -80,7 +80,8 @@ fig, ax = plt.subplots(
 )
 for pattern_idx in range(len(patterns)):
     ax[pattern_idx].scatter(
-        ma.wss_per_pattern[pattern_idx], ma.probs_per_pattern[pattern_idx]
+        diagnostics.wss_per_pattern[pattern_idx],
+        diagnostics.probs_per_pattern[pattern_idx],
     )
     score_to_prob_func = patterns[pattern_idx]["score_to_probability_func"]
     name = (
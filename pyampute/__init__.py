@@ -7,4 +7,5 @@ __version__ = "0.0.1"
 __author__ = "Rianne Schouten, Davina Zamanzadeh, Prabhant Singh"
 
 from pyampute.ampute import MultivariateAmputation
+from pyampute.compact_mask import CompactMask
 from pyampute.utils import ArrayLike, Matrix
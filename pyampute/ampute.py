@@ -2,28 +2,137 @@
 # Author: Rianne Schouten <https://rianneschouten.github.io/>
 # Co-Author: Davina Zamanzadeh <https://davinaz.me/>
 
-from typing import Any, Callable, Dict, List, Optional, Tuple, Type, Union
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Tuple,
+    Type,
+    Union,
+)
 import logging
 import numpy as np
-from pandas import DataFrame, read_csv, isnull
+from pandas import DataFrame, isnull
+from pandas.util import hash_pandas_object
 from sklearn.base import TransformerMixin, BaseEstimator
-from scipy import stats
 from math import isclose
 
 # Local
+from pyampute.compact_mask import CompactMask
 from pyampute.utils import (
-    LOOKUP_TABLE_PATH,
     ArrayLike,
     Matrix,
     isin,
-    is_numeric,
-    enforce_numeric,
+    numeric_coercion_plan,
+    coerce_numeric,
+    count_distinct,
     standardize_uppercase,
     sigmoid,
+    group_segments,
+    exact_group_counts,
+    permutation_segments,
+    weighted_choice_exact,
+    grouped_mean_std,
+    grouped_rowwise_dot,
+    map_row_blocks,
+    ROW_BLOCK_SIZE,
+    DataSketch,
+)
+from pyampute.calibration import (
+    LOOKUP_TABLE_RESOURCE,
+    SIGMOID_CUTOFFS,
+    custom_logits,
+    custom_shift_table,
+    histogram_logits,
+    load_shift_lookup_table,
+    solve_shift_grid,
+    solve_shifts,
+    unshifted_logits,
 )
 
 THRESHOLD_MIN_NUM_CANDIDATES = 10
 THRESHOLD_MIN_NUM_UNIQUE_WSS = 5
+DEFAULT_SKETCH_SIZE = 100000
+# partial_fit recalibrates the shifts once this fraction of the sample of
+# rows has been replaced since the last calibration
+RECALIBRATION_FRACTION = 0.1
+# a recalibration in progress scores this many sampled rows per row of a
+# partial_fit batch, so it is done before the next one is due
+RECALIBRATION_ROWS_PER_ROW = 10
+
+
+class PatternCalibration(NamedTuple):
+    """
+    Per pattern calibration of the score to probability functions: wss are
+    standardized with ``wss_means`` and ``wss_stds`` and shifted by
+    ``shifts``. Patterns flagged ``constant`` have (almost) the same wss for
+    all candidates and are amputed with uniform probability instead.
+    """
+
+    wss_means: np.ndarray
+    wss_stds: np.ndarray
+    shifts: np.ndarray
+    constant: np.ndarray
+
+
+class PendingCalibration(NamedTuple):
+    """
+    Recalibration of partial_fit in progress: the first `num_rows` rows of
+    the sample are scored with the standardized ``weights`` and ``offsets``
+    of the time it started, ``position`` rows so far, into ``scores``.
+    """
+
+    weights: np.ndarray
+    offsets: np.ndarray
+    scores: np.ndarray
+    position: int
+    changes: int
+
+
+class PropSweep(NamedTuple):
+    """
+    Calibration of every pattern for a sweep of missingness proportions
+    ``props``, made by ``calibrate_props`` on the data with ``fingerprint``
+    (of all rows).
+    ``scores`` are the weighted sum scores of all rows under every pattern,
+    as ``(wss, groups, order, bounds)``, and ``calibrations`` holds one
+    :class:`PatternCalibration` per proportion.
+    """
+
+    fingerprint: int
+    props: np.ndarray
+    scores: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]
+    calibrations: List[PatternCalibration]
+
+
+class DataProfile(NamedTuple):
+    """
+    Summary of the data validated in ``fit``: the dtypes and (capped)
+    numbers of distinct values of the involved vars, and a fingerprint to
+    recognize the same data in ``transform`` without counting them again.
+    """
+
+    dtypes: List[np.dtype]
+    distinct_counts: np.ndarray
+    fingerprint: int
+
+
+class AmputationDiagnostics(NamedTuple):
+    """
+    What a single call to ``transform`` drew: the pattern each data row was
+    assigned to, of shape `(n,)`, and per pattern the weighted sum scores
+    and missingness probabilities of the rows assigned to it (in row order),
+    as lists of :math:`k` arrays.
+    """
+
+    assigned_group_number: np.ndarray
+    wss_per_pattern: List[np.ndarray]
+    probs_per_pattern: List[np.ndarray]
 
 
 class MultivariateAmputation(TransformerMixin, BaseEstimator):
@@ -81,11 +190,15 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
                 The simgoid functions dictate that a [high, low, average, extreme] score (respectively) has a high probability of amputation.
                 The sigmoid functions will be shifted to ensure correct joint missingness probabilities.
                 Custom functions must accept arrays with values ``(-inf, inf)`` and output values ``[0,1]``.
-                We will *not* shift custom functions, refer to              :ref:`sphx_glr_auto_examples_plot_custom_probability_function.py` for more.
+                Custom functions are only shifted with ``calibrate_custom=True``, on the logit scale like the sigmoids, to :math:`\\sigma(\\mathrm{logit}(f(x)) + b)`.
+                The shifts are read from a lookup table built for the function on first use and cached on disk, keyed by a hash of its code, defaults, closure, the globals it refers to (resolved at the time) and the table parameters.
+                Functions that refer to values without such a hash that is the same in every process (e.g. objects whose repr holds a memory address) are only cached in memory.
+                Otherwise custom functions are applied as they are, refer to :ref:`sphx_glr_auto_examples_plot_custom_probability_function.py` for more.
 
     std : bool, default : True
         Whether or not to standardize data before computing weighted scores.
         Standardization ensures that weights can be interpreted relative to each other.
+        The means and standard deviations are computed in ``fit`` and reused by every ``transform``.
         Do not standardize if train and test split is done after amputation (prevent leaking).
 
     verbose: bool, default : False
@@ -94,6 +207,7 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
     seed: int, optional
         If you want reproducible results during amputation, set an integer seed.
         If you don't set it, a random number will be produced every time.
+        Random draws come from generators spawned from ``np.random.SeedSequence(seed)``, never from the global numpy random state.
 
     lower_range : float, default : -3
         Lower limit in range when searching for horizontal shift of `score_to_probability_func`.
@@ -108,6 +222,50 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
     max_iter : int, default : 100
         Max number of iterations for binary search when searching for horizontal shift of `score_to_probability_func`.
 
+    copy : bool, default : True
+        Whether ``transform`` returns an amputed copy of the data.
+        If False, missing values are written into the passed array or DataFrame directly (only the affected DataFrame blocks are touched), which avoids doubling memory for large datasets.
+        This requires all variables that can be amputed to be of float dtype.
+
+    sketch_size : int, default : 100000
+        Maximum number of rows sampled from the data passed to :meth:`fit_chunked` or :meth:`partial_fit`, on which the amputation is calibrated.
+
+    n_jobs : int, optional
+        Number of threads that transform blocks of rows in parallel. None means 1 and -1 means using all processors.
+        The calibration is computed once for all rows and the random draws do not depend on the blocks, so results are the same for every `n_jobs`.
+
+    dtype : type, optional, default : np.float64
+        Floating point type in which weighted sum scores and probabilities are computed, e.g. ``np.float32`` to halve the memory traffic for large data.
+        If None, the dtype of the vars involved in amputation is kept if it is floating, and float64 is used otherwise.
+
+    assignment : str, {"random", "exact"}, default : "random"
+        How rows are assigned to patterns.
+        With "random" every row draws its pattern independently with probability `freq`, so the number of rows per pattern varies between amputations.
+        With "exact" the numbers of rows per pattern are `freq` times `n` rounded such that they sum to `n`, and the rows are dealt out with one random permutation, which lowers the variance of simulation results.
+
+    selection : str, {"bernoulli", "exact"}, default : "bernoulli"
+        How the rows to ampute are chosen among the rows assigned to a pattern.
+        With "bernoulli" every row is amputed independently with its missingness probability, so `prop` is only met on average.
+        With "exact" exactly ``round(prop * n_k)`` of the `n_k` rows of a pattern are amputed, sampled without replacement with probability proportional to the score to probability function.
+        Since the counts are fixed, the sigmoid functions are not shifted, which skips the lookup table and the binary search.
+
+    calibration_bins : int, optional
+        If set, the shift of a sigmoid function is searched for on a histogram with this many bins of the standardized weighted sum scores of a pattern, when the pattern has more rows.
+        Every search step then costs `O(bins)` instead of `O(n)`, while the probabilities are still computed for every row.
+        The missingness proportion the shift gives on all rows is logged, with a warning if it is further than `max_diff_with_target` from `prop`.
+        Only used when the shift is not read from the lookup table.
+
+    calibration : str, {"lookup", "search", "hybrid"}, default : "lookup"
+        How the shifts of the score to probability functions are found.
+        With "lookup" they are interpolated from a table of shifts for standard normal weighted sum scores, which is fast but approximate for other score distributions, and searched for if the table cannot be loaded.
+        With "search" they are solved on the actual scores, starting from the middle of `[lower_range, upper_range]`.
+        With "hybrid" they are solved on the actual scores starting from the tabulated shifts, which meets `max_diff_with_target` on skewed or binary-heavy data in a few evaluations.
+
+    calibrate_custom : bool, default : False
+        Whether custom score to probability functions are shifted as well, such that they give missingness proportion `prop`.
+        A custom function :math:`f` is shifted on the logit scale, to :math:`\\sigma(\\mathrm{logit}(f(x)) + b)`, which is how the prespecified sigmoids are shifted too.
+        The shift is read from a lookup table that is built for the function on first use and cached on disk (in ``$PYAMPUTE_CACHE_DIR``, by default ``~/.cache/pyampute``), keyed by a hash of the function and the table parameters, so other processes reuse it (see `score_to_probability_func`).
+
     Attributes
     ----------
     DEFAULT_PATTERN: Dict[str, Any]
@@ -125,6 +283,21 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
 
     DEFAULTS :  Dict[str, Any]
         Default values used, especially if values are not passed for parameters in certain patterns (not to be confused with patterns not being specified at all).
+
+    column_means : np.ndarray of shape `(m,)`
+        Means of the vars involved in amputation, computed in ``fit`` if `std`. NaN for other vars.
+
+    column_stds : np.ndarray of shape `(m,)`
+        Standard deviations of the vars involved in amputation, computed in ``fit`` if `std`. NaN for other vars.
+
+    reference_calibration : PatternCalibration, optional
+        Calibration of every pattern on the data passed to :meth:`fit_chunked` or :meth:`partial_fit`, used by all subsequent transforms.
+        None after ``fit``, in which case every transform calibrates the patterns on the rows assigned to them.
+
+    prop_sweep : PropSweep, optional
+        Weighted sum scores and calibrations for every proportion passed to :meth:`calibrate_props`.
+        While `prop` is one of these proportions, :meth:`sample_masks` on the same data only draws the masks.
+        None after ``fit``.
     
     See also
     --------
@@ -171,6 +344,15 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
         upper_range: float = 3,
         max_diff_with_target: float = 0.001,
         max_iter: int = 100,
+        copy: bool = True,
+        sketch_size: int = DEFAULT_SKETCH_SIZE,
+        n_jobs: Optional[int] = None,
+        dtype: Optional[type] = np.float64,
+        assignment: str = "random",
+        selection: str = "bernoulli",
+        calibration_bins: Optional[int] = None,
+        calibrate_custom: bool = False,
+        calibration: str = "lookup",
     ):
         self.prop = prop
         self.patterns = patterns
@@ -181,10 +363,23 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
         self.max_iter = max_iter
         self.seed = seed
         self.verbose = verbose
-
-        self.assigned_group_number = None
-        self.wss_per_pattern = []
-        self.probs_per_pattern = []
+        self.copy = copy
+        self.sketch_size = sketch_size
+        self.n_jobs = n_jobs
+        self.dtype = dtype
+        self.assignment = assignment
+        self.selection = selection
+        self.calibration_bins = calibration_bins
+        self.calibrate_custom = calibrate_custom
+        self.calibration = calibration
+
+        self.reference_calibration = None
+        self.prop_sweep = None
+        # running statistics and row sample of partial_fit/fit_chunked
+        self._sketch = None
+        self._calibrated_changes = 0
+        self._pending_calibration = None
+        self._stream_seed_sequence = None
         # The rest are set by _pattern_dict_to_matrix_form()
 
         # Ref: https://stackoverflow.com/a/46098711/1888794
@@ -211,23 +406,16 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
                 This pushes smaller values to have high probability.
             - Mid: Values in the center of the score distribution have high probability.
             - Tail: Larger and smaller values have high probabiliy.
+
+        Custom functions are shifted on the logit scale, like the sigmoids.
         """
         if isinstance(probability_func, str):
-            cutoff_transformations = {
-                "SIGMOID-RIGHT": lambda wss_standardized, b: wss_standardized + b,
-                "SIGMOID-LEFT": lambda wss_standardized, b: -wss_standardized + b,
-                "SIGMOID-TAIL": lambda wss_standardized, b: (
-                    np.absolute(wss_standardized) - 0.75 + b
-                ),
-                "SIGMOID-MID": lambda wss_standardized, b: (
-                    -np.absolute(wss_standardized) + 0.75 + b
-                ),
-            }
-
-            return sigmoid(
-                cutoff_transformations[probability_func](wss_standardized, shift_amount)
-            )
-        return probability_func(wss_standardized) + shift_amount
+            sign, absolute, offset = SIGMOID_CUTOFFS[probability_func]
+            scores = np.absolute(wss_standardized) if absolute else wss_standardized
+            # python scalars keep the dtype of the scores
+            return sigmoid(sign * scores + float(offset + shift_amount))
+        logits = custom_logits(probability_func, wss_standardized)
+        return sigmoid(logits + logits.dtype.type(shift_amount))
 
     @staticmethod
     def _binary_search(
@@ -245,48 +433,55 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
         passing through ``self.score_to_probability_func``.
         For instance, raw wss will mask 17% of samples in pattern :math:`k` but 
         you may want 40% missing.
-        """
-
-        b = 0
-        counter = 0
-        probs_array = None
-
-        # start binary search with maximum number of iterations of max_iter
-        while counter < max_iter:
-            counter += 1
 
-            # in every iteration, the new b is the mid of the lower and upper range
-            # the lower and upper range are updated at the end of each iteration
-            b = lower_range + (upper_range - lower_range) / 2
-            if counter == max_iter:
-                break
-
-            # calculate the expected missingness proportion
-            # depends on the logit cutoff type, the sumscores and b
-            probs_array = MultivariateAmputation._shifted_probability_func(
+        Solves for a single pattern with :func:`~pyampute.calibration.solve_shifts`
+        and returns the shift with the probabilities it gives.
+        """
+        wss_standardized = np.asarray(wss_standardized)
+        shifts, _ = solve_shifts(
+            unshifted_logits(score_to_probability_func, wss_standardized),
+            [0, len(wss_standardized)],
+            missingness_percent,
+            lower_range,
+            upper_range,
+            max_iter,
+            max_diff_with_target,
+        )
+        b = shifts[0]
+        return (
+            b,
+            MultivariateAmputation._shifted_probability_func(
                 wss_standardized, b, score_to_probability_func
+            ),
+        )
+
+    def _lookup_shift(
+        self,
+        score_to_probability_func: Union[str, Callable[[ArrayLike], ArrayLike]],
+        missingness_percent: float,
+    ) -> float:
+        """
+        Shift of a prespecified score to probability function in the lookup
+        table, linearly interpolated between the tabulated proportions.
+        Custom functions are looked up in their own table, built on first use.
+        """
+        if isinstance(score_to_probability_func, str):
+            return self.shift_lookup_table.shift(
+                score_to_probability_func, missingness_percent
             )
-            current_prop = np.mean(probs_array)
-
-            # if the expected proportion is close to the target, break
-            # the maximum difference can be specified
-            # if max_dif_with_target is 0.001, the proportion differs with max 0.1%
-            if np.absolute(current_prop - missingness_percent) < max_diff_with_target:
-                break
-
-            # if we have not reached the desired proportion
-            # we adjust either the upper or lower range
-            # this way works for self.score_to_probability_func[i] = 'SIGMOID-RIGHT'
-            # need to check for the other types
-            # in the next iteration, a new b is then calculated and used
-            if (current_prop - missingness_percent) > 0:
-                upper_range = b
-            else:
-                lower_range = b
+        table = custom_shift_table(
+            score_to_probability_func, self.lower_range, self.upper_range
+        )
+        return table.shift(table.functions[0], missingness_percent)
 
-        return b, probs_array
+    def _is_shifted(self, pattern_idx: int) -> bool:
+        """Whether the score to probability function of a pattern is shifted."""
+        return self.selection == "bernoulli" and (
+            isinstance(self.score_to_probability_func[pattern_idx], str)
+            or self.calibrate_custom
+        )
 
-    def _calculate_probabilities_from_wss(
+    def _calculate_shift(
         self,
         wss_standardized: ArrayLike,
         score_to_probability_func: Union[str, Callable[[ArrayLike], ArrayLike]],
@@ -295,45 +490,42 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
         upper_range: float,
         max_iter: int,
         max_diff_with_target: float,
-    ) -> ArrayLike:
+    ) -> float:
         """
-        Returns the result of ``_shifted_probability_func``
+        Returns the shift for one of the prespecified score to probability
+        functions, from the lookup table if available or else found by
+        ``_binary_search``. Use ``_calculate_shifts`` for several patterns.
         """
-        if isinstance(score_to_probability_func, str):
-            if self.shift_lookup_table is not None:
-                logging.info(
-                    "Rounding proportion of missingness to 2 "
-                    "decimal places in order to use lookup table for"
-                    " one of the prespecified score to probability functions."
-                )
-                prop = np.around(self.prop, 2)
+        if self.shift_lookup_table is not None:
+            return self._lookup_shift(score_to_probability_func, missingness_percent)
+        # If no lookup table, but sigmoid, run binary search
+        return self._binary_search(
+            wss_standardized,
+            score_to_probability_func,
+            missingness_percent,
+            lower_range,
+            upper_range,
+            max_iter,
+            max_diff_with_target,
+        )[0]
 
-                shift = self.shift_lookup_table.loc[
-                    score_to_probability_func, "{:.2f}".format(prop)
-                ]
-                return self._shifted_probability_func(
-                    wss_standardized, shift, score_to_probability_func
-                )
-            # If no lookup table, but sigmoid, run binary search
-            return self._binary_search(
-                wss_standardized,
-                score_to_probability_func,
-                missingness_percent,
-                lower_range,
-                upper_range,
-                max_iter,
-                max_diff_with_target,
-            )[1]
-
-        # if not sigmoid, no binary search/shift
-        return score_to_probability_func(wss_standardized)
-
-    def _choose_probabilities(self, pattern_index: int) -> ArrayLike:
+    def _calibrate(
+        self,
+        wss: ArrayLike,
+        assigned_group_number: ArrayLike,
+        group_order: ArrayLike,
+        group_bounds: ArrayLike,
+        distinct_counts: Optional[np.ndarray] = None,
+    ) -> PatternCalibration:
         """
-        Assigns missingness probabilities to each sample (row) in the data
-        subset corresponding to pattern :math:`k` using the standardized wss.
-        These probabilities are later used to decide whether or not to apply
-        pattern :math:`k` to sample :math:`i`.
+        Computes, for every pattern, the statistics to standardize the wss of
+        its data subset with and the shift of its score to probability
+        function for the desired missingness proportion.
+
+        ``distinct_counts`` are the (capped) numbers of distinct values per
+        involved var found during validation. They bound the number of
+        distinct wss of a pattern, so patterns weighting only a few binary
+        vars (or none, under MCAR) are recognized without counting their wss.
 
         When wss are all the same the mechanism is
             1. MCAR: each case has an equal probability of becoming missing
@@ -348,88 +540,441 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
         candidates and will trigger a warning, but if they're all unique wss,
         then MCAR will NOT be applied.
         """
+        wss_means, wss_stds, constant, shifted_patterns = self._calibration_statistics(
+            wss, assigned_group_number, group_order, group_bounds, distinct_counts
+        )
+        shifts = np.zeros(self.num_patterns)
+        shifts[shifted_patterns] = self._calculate_shifts(
+            wss, group_order, group_bounds, wss_means, wss_stds, shifted_patterns
+        )
+        return PatternCalibration(wss_means, wss_stds, shifts, constant)
 
-        wss = self.wss_per_pattern[pattern_index]
-        if np.all(wss == wss[0]) or len(np.unique(wss)) <= THRESHOLD_MIN_NUM_UNIQUE_WSS:
-            probs = np.repeat(self.prop, len(wss))
-        else:  # else we calculate the probabilities based on the wss
-            # standardize wss
-            wss_standardized = stats.zscore(wss)
-            # calculate the size of b for the desired missingness proportion
-            probs_array = self._calculate_probabilities_from_wss(
-                wss_standardized,
-                self.score_to_probability_func[pattern_index],
-                self.prop,
-                self.lower_range,
-                self.upper_range,
-                self.max_iter,
-                self.max_diff_with_target,
-            )
-            probs = np.squeeze(np.asarray(probs_array))
-        self.probs_per_pattern.append(probs)
-
-        return probs
-
-    def _calculate_sumscores(self, data_group: Matrix, pattern_ind: int) -> ArrayLike:
+    def _calibration_statistics(
+        self,
+        wss: ArrayLike,
+        assigned_group_number: ArrayLike,
+        group_order: ArrayLike,
+        group_bounds: ArrayLike,
+        distinct_counts: Optional[np.ndarray] = None,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, List[int]]:
         """
-        Creates a vector of weighted sum scores for all data rows (samples) in
-        the data subset corresponding to pattern :math:`k` by computing the
-        inner product of ``self.weights`` and the raw values of the samples in
-        that subset. This is later converted to a probability to be thresholded
-        on to decide whether or not to apply pattern :math:`k` to sample
-        :math:`i` in the data subset.
+        Everything ``_calibrate`` needs besides the shifts: the means and
+        standard deviations of the wss per pattern, which patterns are
+        constant and which are to be shifted.
         """
-
-        if len(data_group) <= THRESHOLD_MIN_NUM_CANDIDATES:
+        group_sizes = np.diff(group_bounds)
+        for pattern_idx in np.where(group_sizes <= THRESHOLD_MIN_NUM_CANDIDATES)[0]:
             logging.warning(
-                f"Subset for pattern {pattern_ind} is small. "
+                f"Subset for pattern {pattern_idx} is small. "
                 "Too many patterns can result in subsets with 0 or few candidates. "
                 "Subsets with 0 candidates will be skipped. "
                 "Under MCAR, subsets with few candidates will be amputed as normal."
             )
 
-        # transform only vars involved in amputation to numeric to compute weights
-        # does not transform the original datset
-        logging.info(
-            "Enforcing data to be numeric since calculation of weights"
-            " requires numeric data."
+        # standardize wss within each pattern
+        wss_means, wss_stds = grouped_mean_std(
+            wss, assigned_group_number, self.num_patterns
         )
-        data_group = enforce_numeric(data_group, self.vars_involved_in_ampute)
-        # standardize data or not
-        if self.std:
-            data_group = stats.zscore(data_group)
+        wss_stds[wss_stds == 0] = 1
+
+        distinct_wss_bounds = self._distinct_wss_bounds(distinct_counts)
+        constant = np.zeros(self.num_patterns, dtype=bool)
+        shifted_patterns = []
+        for pattern_idx in range(self.num_patterns):
+            group_indices = group_order[
+                group_bounds[pattern_idx] : group_bounds[pattern_idx + 1]
+            ]
+            if (
+                distinct_wss_bounds[pattern_idx] <= THRESHOLD_MIN_NUM_UNIQUE_WSS
+                or count_distinct(wss[group_indices], THRESHOLD_MIN_NUM_UNIQUE_WSS)
+                <= THRESHOLD_MIN_NUM_UNIQUE_WSS
+            ):
+                constant[pattern_idx] = True
+                if self.mechanisms[pattern_idx] != "MCAR" and len(group_indices) > 0:
+                    logging.warning(
+                        f"Candidates for pattern {pattern_idx} all have almost "
+                        f"the same weighted sum scores. "
+                        "It is possible this is due to the use of binary variables in amputation. "
+                        "This creates problems when using the "
+                        "sigmoid function for the score_to_probability_func. "
+                        "Currently our solution is as follows: if there is just"
+                        " one candidate with a sum score 0, we will ampute it. "
+                        "If there is one candidate with a nonzero sum score,"
+                        " or multiple candidates with the same score, we evenly apply as if MCAR."
+                    )
+            elif self._is_shifted(pattern_idx):
+                # calculate the size of b for the desired missingness proportion
+                # (exact selection fixes the number of amputed rows instead)
+                shifted_patterns.append(pattern_idx)
+            # if not sigmoid or calibrated custom function, no search/shift
 
-        # calculate sum scores
-        # in case of MCAR, weights[i, ] contains merely zeros and wss are merely zeros
-        # in case of MAR, MNAR, the mechanisms is determined by the weights
-        wss = np.dot(data_group, self.weights[pattern_ind, :].T)
-        self.wss_per_pattern.append(wss)
+        return wss_means, wss_stds, constant, shifted_patterns
 
-        if (
-            len(np.unique(wss)) <= THRESHOLD_MIN_NUM_UNIQUE_WSS
-            and self.mechanisms[pattern_ind] != "MCAR"
-        ):
-            logging.warning(
-                f"Candidates for pattern {pattern_ind} all have almost "
-                f"the same weighted sum scores. "
-                "It is possible this is due to the use of binary variables in amputation. "
-                "This creates problems when using the "
-                "sigmoid function for the score_to_probability_func. "
-                "Currently our solution is as follows: if there is just"
-                " one candidate with a sum score 0, we will ampute it. "
-                "If there is one candidate with a nonzero sum score,"
-                " or multiple candidates with the same score, we evenly apply as if MCAR."
+    def _calculate_shifts(
+        self,
+        wss: ArrayLike,
+        group_order: ArrayLike,
+        group_bounds: ArrayLike,
+        wss_means: np.ndarray,
+        wss_stds: np.ndarray,
+        pattern_indices: List[int],
+    ) -> np.ndarray:
+        """
+        Returns the shifts of the sigmoid functions of the given patterns,
+        from the lookup table if available or else solved for all of them at
+        once on their standardized wss. With hybrid calibration, the solver
+        starts from the shifts in the lookup table.
+        """
+        table_shifts = self._table_shifts(pattern_indices, [self.prop])
+        if table_shifts is not None:
+            table_shifts = table_shifts[:, 0]
+            if self.calibration == "lookup":
+                return table_shifts
+        if len(pattern_indices) == 0:
+            return np.zeros(0)
+
+        logits, weights, starts = self._calibration_logits(
+            wss, group_order, group_bounds, wss_means, wss_stds, pattern_indices
+        )
+        shifts, _ = solve_shifts(
+            logits,
+            starts,
+            self.prop,
+            self.lower_range,
+            self.upper_range,
+            self.max_iter,
+            self.max_diff_with_target,
+            weights,
+            table_shifts,
+        )
+        return shifts
+
+    def _calculate_shift_grid(
+        self,
+        wss: ArrayLike,
+        group_order: ArrayLike,
+        group_bounds: ArrayLike,
+        wss_means: np.ndarray,
+        wss_stds: np.ndarray,
+        pattern_indices: List[int],
+        props: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Like ``_calculate_shifts``, but for every proportion in ``props`` at
+        once, of shape `(len(pattern_indices), len(props))`. All patterns
+        must have the same number of rows, as in ``_sumscores_per_pattern``.
+        """
+        table_shifts = self._table_shifts(pattern_indices, props)
+        if table_shifts is not None and self.calibration == "lookup":
+            return table_shifts
+        if len(pattern_indices) == 0:
+            return np.zeros((0, len(props)))
+
+        logits, weights, starts = self._calibration_logits(
+            wss, group_order, group_bounds, wss_means, wss_stds, pattern_indices
+        )
+        assert (np.diff(starts) == starts[1]).all(), (
+            "All patterns must be calibrated on the same number of rows."
+        )
+        shape = (len(pattern_indices), starts[1])
+        return solve_shift_grid(
+            logits.reshape(shape),
+            props,
+            self.lower_range,
+            self.upper_range,
+            self.max_iter,
+            self.max_diff_with_target,
+            self.n_jobs,
+            None if weights is None else weights.reshape(shape),
+            table_shifts,
+        )
+
+    def _table_shifts(
+        self, pattern_indices: List[int], props: ArrayLike
+    ) -> Optional[np.ndarray]:
+        """
+        Shifts of the given patterns in the lookup tables for every
+        proportion, of shape `(len(pattern_indices), len(props))`, or None
+        if there is no lookup table.
+        """
+        if self.shift_lookup_table is None:
+            return None
+        return np.array(
+            [
+                [
+                    self._lookup_shift(self.score_to_probability_func[pattern_idx], prop)
+                    for prop in props
+                ]
+                for pattern_idx in pattern_indices
+            ],
+            dtype=float,
+        ).reshape(len(pattern_indices), len(props))
+
+    def _calibration_logits(
+        self,
+        wss: ArrayLike,
+        group_order: ArrayLike,
+        group_bounds: ArrayLike,
+        wss_means: np.ndarray,
+        wss_stds: np.ndarray,
+        pattern_indices: List[int],
+    ) -> Tuple[np.ndarray, Optional[np.ndarray], np.ndarray]:
+        """
+        Unshifted logits of the standardized wss of the given patterns, one
+        contiguous segment per pattern between ``starts``, with their weights
+        if large groups are binned into histograms.
+        """
+        # large groups are calibrated on a histogram of their logits
+        group_sizes = np.diff(group_bounds)[pattern_indices]
+        if self.calibration_bins is not None:
+            binned = group_sizes > self.calibration_bins
+            group_sizes = np.where(binned, self.calibration_bins, group_sizes)
+        logits = np.empty(group_sizes.sum(), dtype=wss.dtype)
+        weights = None if self.calibration_bins is None else np.ones(len(logits))
+        starts = np.concatenate(([0], np.cumsum(group_sizes)))
+        for idx, pattern_idx in enumerate(pattern_indices):
+            group_indices = group_order[
+                group_bounds[pattern_idx] : group_bounds[pattern_idx + 1]
+            ]
+            group_logits = unshifted_logits(
+                self.score_to_probability_func[pattern_idx],
+                (wss[group_indices] - wss.dtype.type(wss_means[pattern_idx]))
+                / wss.dtype.type(wss_stds[pattern_idx]),
+            )
+            segment = slice(starts[idx], starts[idx + 1])
+            if weights is not None and binned[idx]:
+                logits[segment], weights[segment] = histogram_logits(
+                    group_logits, self.calibration_bins
+                )
+            else:
+                logits[segment] = group_logits
+        return logits, weights, starts
+
+    def _distinct_wss_bounds(self, distinct_counts: Optional[np.ndarray]) -> np.ndarray:
+        """
+        Upper bound on the number of distinct wss per pattern: the product of
+        the numbers of distinct values of the vars it weights. Without counts
+        nothing is known and the bound is infinite.
+        """
+        if distinct_counts is None:
+            return np.full(self.num_patterns, np.inf)
+        weighted = self.weights[:, self.vars_involved_in_ampute] != 0
+        return np.prod(np.where(weighted, distinct_counts, 1), axis=1, dtype=float)
+
+    def _choose_probabilities(
+        self,
+        wss: ArrayLike,
+        assigned_group_number: ArrayLike,
+        group_order: ArrayLike,
+        group_bounds: ArrayLike,
+        calibration: PatternCalibration,
+    ) -> ArrayLike:
+        """
+        Assigns missingness probabilities to each sample (row) in the data
+        using the standardized wss and shift of the pattern it is assigned to.
+        These probabilities are later used to decide whether or not to apply
+        pattern :math:`k` to sample :math:`i`. All sigmoid patterns are handled
+        in one pass; only custom functions and patterns that are amputed with
+        uniform probability are resolved per pattern.
+        """
+        # computed in the dtype of the wss
+        dtype = wss.dtype
+        # logit cutoff parameters per pattern, custom functions are applied below
+        cutoffs = np.array(
+            [
+                SIGMOID_CUTOFFS[func] if isinstance(func, str) else (1, False, 0)
+                for func in self.score_to_probability_func
+            ],
+            dtype=dtype,
+        )
+        wss_means = calibration.wss_means.astype(dtype)
+        wss_stds = calibration.wss_stds.astype(dtype)
+        shifts = calibration.shifts.astype(dtype)
+        wss_standardized = np.empty(len(wss), dtype=dtype)
+        probs = np.empty(len(wss), dtype=dtype)
+
+        def probabilities_block(rows: slice):
+            groups = assigned_group_number[rows]
+            wss_standardized[rows] = (wss[rows] - wss_means[groups]) / wss_stds[groups]
+            sign, absolute, offset = cutoffs[groups].T
+            logits = np.where(
+                absolute == 1,
+                np.absolute(wss_standardized[rows]),
+                wss_standardized[rows],
             )
+            logits *= sign
+            logits += offset + shifts[groups]
+            probs[rows] = sigmoid(logits)
+
+        map_row_blocks(probabilities_block, len(wss), self.n_jobs)
+
+        for pattern_idx in range(self.num_patterns):
+            func = self.score_to_probability_func[pattern_idx]
+            if not calibration.constant[pattern_idx] and isinstance(func, str):
+                continue
+            group_indices = group_order[
+                group_bounds[pattern_idx] : group_bounds[pattern_idx + 1]
+            ]
+            if calibration.constant[pattern_idx]:
+                probs[group_indices] = self.prop
+            elif self._is_shifted(pattern_idx):
+                probs[group_indices] = sigmoid(
+                    custom_logits(func, wss_standardized[group_indices])
+                    + dtype.type(shifts[pattern_idx])
+                )
+            else:
+                probs[group_indices] = np.squeeze(
+                    np.asarray(func(wss_standardized[group_indices]))
+                )
+
+        if self.calibration_bins is not None:
+            self._report_calibration_errors(probs, assigned_group_number, calibration)
+        return probs
+
+    def _report_calibration_errors(
+        self,
+        probs: np.ndarray,
+        assigned_group_number: ArrayLike,
+        calibration: PatternCalibration,
+    ):
+        """
+        Logs how far the mean probability of every shifted pattern, computed
+        over all of its rows, is from the desired missingness proportion.
+        """
+        counts = np.bincount(assigned_group_number, minlength=self.num_patterns)
+        means = np.bincount(
+            assigned_group_number, weights=probs, minlength=self.num_patterns
+        ) / np.maximum(counts, 1)
+        for pattern_idx in range(self.num_patterns):
+            if (
+                calibration.constant[pattern_idx]
+                or not self._is_shifted(pattern_idx)
+                or counts[pattern_idx] == 0
+            ):
+                continue
+            error = means[pattern_idx] - self.prop
+            message = (
+                f"Calibration error of pattern {pattern_idx}: the missingness "
+                f"proportion is {means[pattern_idx]:.4f} instead of {self.prop:.4f}."
+            )
+            if np.absolute(error) > self.max_diff_with_target:
+                logging.warning(message)
+            else:
+                logging.info(message)
+
+    def _involved_numeric_data(self, X: Matrix, dtype: type = np.float64) -> np.ndarray:
+        """
+        Returns the vars involved in amputation as a numeric array of shape
+        `(n, number of involved vars)` and type ``dtype``. Does not transform
+        the original dataset. Only non-numeric vars are converted, following
+        the coercion plan from ``fit`` if the dtypes still match, so numeric
+        data of type ``dtype`` in a contiguous range of columns is not copied.
+        """
+        involved_idx = np.flatnonzero(self.vars_involved_in_ampute)
+        if len(involved_idx) > 0 and (np.diff(involved_idx) == 1).all():
+            # a slice gives a view rather than a copy
+            involved_idx = slice(involved_idx[0], involved_idx[-1] + 1)
+        involved_data = (
+            X.iloc[:, involved_idx]
+            if isinstance(X, DataFrame)
+            else np.asarray(X)[:, involved_idx]
+        )
+        involved_dtypes = self._involved_dtypes(X)
+        plan = (
+            self._coercion_plan
+            if involved_dtypes == self._fit_involved_dtypes
+            else numeric_coercion_plan(involved_dtypes)
+        )
+        if plan.any():
+            # transform only vars involved in amputation to numeric to compute weights
+            logging.info(
+                "Enforcing data to be numeric since calculation of weights"
+                " requires numeric data."
+            )
+        return coerce_numeric(involved_data, plan, dtype)
+
+    def _involved_dtypes(self, X: Matrix) -> List[np.dtype]:
+        """Dtypes of the vars involved in amputation."""
+        if isinstance(X, DataFrame):
+            return list(X.dtypes.iloc[self.vars_involved_in_ampute])
+        return [np.asarray(X).dtype] * int(self.vars_involved_in_ampute.sum())
+
+    def _computation_dtype(self, X: Matrix) -> np.dtype:
+        """
+        Dtype of the sum scores and probabilities for X: ``self.dtype``, or
+        if None, the floating dtype of the involved vars (else float64, also
+        if no vars are involved).
+        """
+        if self.dtype is not None:
+            return np.dtype(self.dtype)
+        # only MCAR patterns: no scores are computed from the data
+        if not self.vars_involved_in_ampute.any():
+            return np.dtype(np.float64)
+        dtype = np.result_type(
+            *(
+                X.dtypes.iloc[self.vars_involved_in_ampute]
+                if isinstance(X, DataFrame)
+                else [X.dtype]
+            )
+        )
+        return dtype if np.issubdtype(dtype, np.floating) else np.dtype(np.float64)
+
+    def _calculate_sumscores(
+        self, X: Matrix, assigned_group_number: ArrayLike
+    ) -> ArrayLike:
+        """
+        Creates a vector of weighted sum scores for all data rows (samples) by
+        computing the inner product of the weights of the pattern each sample
+        is assigned to and the raw values of the sample. When ``self.std``,
+        variables are standardized with the means and standard deviations
+        computed in ``fit``, so scores do not depend on which rows are
+        transformed together. This is later converted to a probability to be
+        thresholded on to decide whether or not to apply pattern :math:`k` to
+        sample :math:`i`. Blocks of rows are scored in parallel.
+        """
+        dtype = self._computation_dtype(X)
+        weights, offsets = self._standardized_weights()
+        weights, offsets = weights.astype(dtype), offsets.astype(dtype)
+        wss = np.empty(X.shape[0], dtype=dtype)
+
+        def sumscores_block(rows: slice):
+            involved_data = self._involved_numeric_data(
+                X[rows] if isinstance(X, np.ndarray) else X.iloc[rows], dtype
+            )
+            groups = assigned_group_number[rows]
+            # calculate sum scores
+            # in case of MCAR, weights[i, ] contains merely zeros and wss are merely zeros
+            # in case of MAR, MNAR, the mechanisms is determined by the weights
+            wss[rows] = grouped_rowwise_dot(involved_data, weights, groups)
+            wss[rows] -= offsets[groups]
+
+        map_row_blocks(sumscores_block, X.shape[0], self.n_jobs)
         return wss
 
+    def _standardized_weights(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Weights of the involved vars, of shape `(k, number of involved vars)`,
+        and offsets per pattern, of shape `(k,)`, such that the inner product
+        of the weights and the raw values minus the offset equals the
+        weighted sum score of the values standardized with the statistics
+        from ``fit``. This way no standardized copy of the data is made.
+        """
+        weights = self.weights[:, self.vars_involved_in_ampute]
+        offsets = np.zeros(self.num_patterns)
+        # standardize data or not
+        if self.std:
+            weights = weights / self.column_stds[self.vars_involved_in_ampute]
+            offsets = weights @ self.column_means[self.vars_involved_in_ampute]
+        return weights, offsets
+
     def _get_default_pattern(self, m_features: int) -> List[Dict[str, Any]]:
         """Default pattern is a single pattern that works for any dataset."""
-        # set seed for choice, if None it will be random.
-        np.random.seed(self.seed)
+        # if seed is None it will be random.
+        rng = np.random.default_rng(self.seed)
         return [
             {
                 # Random half of vars (random 50% of indices)
-                "incomplete_vars": np.random.choice(
+                "incomplete_vars": rng.choice(
                     np.arange(m_features), int(m_features / 2), replace=False
                 ),
                 "mechanism": "MAR",
@@ -557,18 +1102,24 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
 
     def _load_shift_lookup_table(self):
         """
-        Read the lookup table csv from path.
-        Loads the table only once for the shift lookup
-        when computing missing probabilities from scores.
+        Get the lookup table shipped with the package for the shift lookup
+        when computing missing probabilities from scores. The table is read
+        only once per process and shared by all amputers.
         This is only useful for prespecified functions (e.g. sigmoid-right)
         """
-        if any([isinstance(func, str) for func in self.score_to_probability_func]):
+        self.shift_lookup_table = None
+        if self.calibration == "search":
+            return
+        if self.calibrate_custom or any(
+            [isinstance(func, str) for func in self.score_to_probability_func]
+        ):
             try:
-                self.shift_lookup_table = read_csv(LOOKUP_TABLE_PATH, index_col=0)
+                self.shift_lookup_table = load_shift_lookup_table()
             except Exception:
                 logging.warning(
                     "Failed to load lookup table for a prespecified score to probability function. "
-                    f"It is possible {LOOKUP_TABLE_PATH} is missing, in the wrong location, or corrupted. "
+                    f"It is possible {LOOKUP_TABLE_RESOURCE[1]} in package "
+                    f"{LOOKUP_TABLE_RESOURCE[0]} is missing or corrupted. "
                     "Try rerunning scripts/generate_shift_lookup_table.py "
                     "to regenerate the lookup table."
                 )
@@ -746,11 +1297,106 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
             func_str_options,
         ).all(), f"String funcs can only be one of {func_str_options}"
 
+        ###############
+        #    DTYPE    #
+        ###############
+        assert self.dtype is None or np.issubdtype(
+            self.dtype, np.floating
+        ), f"dtype must be a floating point type, but got {self.dtype}."
+
+        ####################
+        #    ASSIGNMENT    #
+        ####################
+        assignment_options = ["random", "exact"]
+        assert (
+            self.assignment in assignment_options
+        ), f"assignment must be one of {assignment_options}."
+
+        ###################
+        #    SELECTION    #
+        ###################
+        selection_options = ["bernoulli", "exact"]
+        assert (
+            self.selection in selection_options
+        ), f"selection must be one of {selection_options}."
+        assert (
+            self.calibration_bins is None or self.calibration_bins > 0
+        ), "calibration_bins must be a positive number of bins."
+
+        #####################
+        #    CALIBRATION    #
+        #####################
+        calibration_options = ["lookup", "search", "hybrid"]
+        assert (
+            self.calibration in calibration_options
+        ), f"calibration must be one of {calibration_options}."
+
     def _validate_data(self, X: Matrix) -> Matrix:
         """
         Validate passed data for transform.
         Will modify the dataset to comply if possible, while giving warnings.
         """
+        return self._validate_data_with_counts(X)[0]
+
+    def _count_distinct_involved(self, X: Matrix) -> np.ndarray:
+        """
+        Number of distinct values of every var involved in amputation, counted
+        up to ``THRESHOLD_MIN_NUM_UNIQUE_WSS + 1``.
+        """
+        return np.array(
+            [
+                count_distinct(column, THRESHOLD_MIN_NUM_UNIQUE_WSS)
+                for column in self._involved_columns(X)
+            ],
+            dtype=int,
+        )
+
+    def _fingerprint(self, X: Matrix, num_rows: Optional[int] = 64) -> int:
+        """
+        Cheap fingerprint of X from its shape, the dtypes of the involved vars
+        and their values in (at most) ``num_rows`` evenly spaced rows. The
+        cost does not grow with the number of rows. With ``num_rows=None``
+        all rows are hashed, which recognizes any change to the involved vars.
+        """
+        rows = (
+            np.arange(X.shape[0])
+            if num_rows is None
+            else np.unique(np.linspace(0, X.shape[0] - 1, num_rows).astype(int))
+        )
+        involved_idx = np.flatnonzero(self.vars_involved_in_ampute)
+        sample = (
+            X.iloc[rows, involved_idx]
+            if isinstance(X, DataFrame)
+            else DataFrame(X[np.ix_(rows, involved_idx)])
+        )
+        sample_hash = (
+            hash_pandas_object(sample, index=False).to_numpy().tobytes()
+            if len(involved_idx) > 0
+            else b""
+        )
+        return hash((X.shape, tuple(self._involved_dtypes(X)), sample_hash))
+
+    def _involved_columns(self, X: Matrix) -> Iterator[np.ndarray]:
+        """
+        Yields the vars involved in amputation one at a time as arrays, via
+        ``to_numpy`` per column for DataFrames and as views for arrays.
+        """
+        for idx in np.flatnonzero(self.vars_involved_in_ampute):
+            yield X.iloc[:, idx].to_numpy() if isinstance(X, DataFrame) else X[:, idx]
+
+    def _validate_data_with_counts(
+        self, X: Matrix, validate: bool = True
+    ) -> Tuple[Matrix, Optional[np.ndarray]]:
+        """
+        Validates X like ``_validate_data`` and also returns the numbers of
+        distinct values of the involved vars, to be reused by ``_calibrate``.
+
+        The involved vars are always checked for missing values, since a
+        fingerprint cannot prove that no value changed since ``fit``. The
+        other checks and the counting are skipped if not ``validate``, or if
+        X matches the profile of the data validated in ``fit``. Then the
+        counts from ``fit`` are returned, or None if X was not profiled.
+        """
         assert X is not None, "No dataset passed, cannot be None."
         assert len(X.shape) == 2, "Dataset must be 2 dimensional."
         assert X.shape[1] > 1, "Dataset passed must contain at least two columns."
@@ -764,24 +1410,29 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
                 X.shape[1] == self.num_features
             ), "Columns do not match the data passed to fit."
 
-        # enforce numpy just for checking
-        X_check = X.values if isinstance(X, DataFrame) else X
-        assert not isnull(
-            X_check[:, self.vars_involved_in_ampute]
-        ).any(), "Features involved in amputation must be complete, but contains NaNs."
-        if not is_numeric(X_check[:, self.vars_involved_in_ampute]):
+        # only the involved vars are checked, one column at a time, so other
+        # columns of a DataFrame are never converted
+        assert not any(
+            isnull(column).any() for column in self._involved_columns(X)
+        ), "Features involved in amputation must be complete, but contains NaNs."
+
+        if not validate:
+            return X, None
+        if self._data_profile is not None and (
+            self._data_profile.fingerprint == self._fingerprint(X)
+        ):
+            return X, self._data_profile.distinct_counts
+
+        if numeric_coercion_plan(self._involved_dtypes(X)).any():
             logging.warning(
                 "Features involved in amputation found to be non-numeric."
                 " They will be forced to numeric upon calculating sum scores."
             )
         # get binary variables involved in amputation
-        iterate_columns = X.values.T if isinstance(X, DataFrame) else X.T
-        binary_vars_mask = (
-            np.array([len(np.unique(col)) for col in iterate_columns]) == 2
-        )
-        binary_vars_involved_in_ampute = np.where(
-            self.vars_involved_in_ampute & binary_vars_mask
-        )[0]
+        distinct_counts = self._count_distinct_involved(X)
+        binary_vars_involved_in_ampute = np.flatnonzero(self.vars_involved_in_ampute)[
+            distinct_counts == 2
+        ]
         if len(binary_vars_involved_in_ampute) > 0:
             logging.warning(
                 f"Binary variables (at indices {binary_vars_involved_in_ampute}) are"
@@ -802,7 +1453,29 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
                 "These will be forced to be numeric upon calculating sum scores."
             )
 
-        return X
+        return X, distinct_counts
+
+    def _validate_inplace(self, X: Matrix):
+        """
+        Validates that missing values can be written into X directly, i.e.
+        without (silently) casting a copy of the data.
+        """
+        amputed_vars = np.where((~self.observed_var_indicator).any(axis=0))[0]
+        if isinstance(X, np.ndarray):
+            assert np.issubdtype(X.dtype, np.floating), (
+                "Amputing in place (copy=False) requires a float array, "
+                f"but got dtype {X.dtype}."
+            )
+        else:
+            non_float_vars = [
+                X.columns[idx]
+                for idx in amputed_vars
+                if not np.issubdtype(X.dtypes.iloc[idx], np.floating)
+            ]
+            assert len(non_float_vars) == 0, (
+                "Amputing in place (copy=False) requires float dtypes for all "
+                f"variables that can be amputed, but got {non_float_vars}."
+            )
 
     def fit(self, X: Matrix, y: ArrayLike = None) -> "MultivariateAmputation":
         """Fits amputer on complete data X.
@@ -822,7 +1495,75 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
             Ignored. 
             Not used, present here for consistency.
         """
+        self._fit_patterns(X)
+        X, distinct_counts = self._validate_data_with_counts(X)
+        self._data_profile = DataProfile(
+            self._involved_dtypes(X), distinct_counts, self._fingerprint(X)
+        )
+
+        # standardization statistics of the involved vars, reused by transform
+        involved_data = self._involved_numeric_data(X) if self.std else None
+        self._set_column_statistics(
+            involved_data.mean(axis=0) if self.std else None,
+            involved_data.std(axis=0) if self.std else None,
+        )
+        self._reset_stream()
+
+        return self
+
+    def _reset_stream(self):
+        """Forgets the data seen by partial_fit and the reference calibration."""
+        self.reference_calibration = None
+        self._sketch = None
+        self._calibrated_changes = 0
+        self._pending_calibration = None
+        self._stream_seed_sequence = None
+
+    def partial_fit(self, X: Matrix, y: ArrayLike = None) -> "MultivariateAmputation":
+        """Incrementally fits amputer on a batch of complete data, e.g. from a stream.
+
+        Keeps running means and variances of the involved vars and a uniform sample of (at most `sketch_size`) rows seen so far.
+        Subsequent calls to ``transform`` standardize with the running statistics and apply shifts calibrated on the sample of all batches seen so far, rather than on the batch being amputed.
+        The work per batch is linear in the batch size: history is never re-standardized, the standardization of the weighted sum scores follows the sample through its running moments, and the shifts are only recalibrated on the whole sample once a tenth of it has been replaced (``RECALIBRATION_FRACTION``).
+        That recalibration is spread over the following batches, which score ``RECALIBRATION_ROWS_PER_ROW`` sampled rows per row they add, so ``transform`` never recalibrates.
+
+        Each transform draws from a random stream derived from `seed`, the number of rows fitted so far and a sample of the rows of its batch, so equally sized batches are not amputed alike, yet the stream as a whole is reproducible and ``transform`` does not modify the amputer.
+        Call ``fit`` to start over.
+
+        Parameters
+        ----------
+        X : Matrix
+            Matrix of shape `(n, m)`.
+            Batch of complete input data, with the same columns for every batch.
+            The same requirements apply as to `X` in ``fit``.
+
+        y : ArrayLike
+            Ignored.
+            Not used, present here for consistency.
+        """
+        if self._sketch is None:
+            self._fit_patterns(X)
+            self._reset_stream()
+            self._stream_seed_sequence = np.random.SeedSequence(self.seed)
+            self._sketch = DataSketch(
+                int(self.vars_involved_in_ampute.sum()),
+                self.sketch_size,
+                np.random.default_rng(self._stream_seed_sequence.spawn(1)[0]),
+            )
+        X = self._validate_data(X)
+        self._sketch.update(self._involved_numeric_data(X))
+        self._set_column_statistics(self._sketch.mean, self._sketch.std)
+        self._update_reference_calibration(
+            RECALIBRATION_ROWS_PER_ROW * X.shape[0]
+        )
+
+        return self
 
+    def _fit_patterns(self, X: Matrix):
+        """
+        Validates parameter settings and converts patterns to matrix form.
+        Only uses the shape, column names and dtypes of X.
+        """
         # This must come first so we can check patterns
         assert X is not None, "No dataset passed, cannot be None."
         assert len(X.shape) == 2, "Dataset must be 2 dimensional."
@@ -895,9 +1636,361 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
             self.weights[self.mechanisms != "MCAR"] != 0
         ).any(axis=0)
 
+        # profile of the validated data, only recorded by fit
+        self._data_profile = None
+        self.prop_sweep = None
+
+        # which involved vars have to be converted to numeric, reused as long
+        # as the data passed to transform has the same dtypes
+        self._fit_involved_dtypes = self._involved_dtypes(X)
+        self._coercion_plan = numeric_coercion_plan(self._fit_involved_dtypes)
+
+    def _set_column_statistics(
+        self, means: Optional[np.ndarray], stds: Optional[np.ndarray]
+    ):
+        """Stores the standardization statistics of the involved vars."""
+        self.column_means = np.full(self.num_features, np.nan)
+        self.column_stds = np.full(self.num_features, np.nan)
+        if self.std:
+            stds = np.array(stds, dtype=float)
+            stds[stds == 0] = 1
+            self.column_means[self.vars_involved_in_ampute] = means
+            self.column_stds[self.vars_involved_in_ampute] = stds
+
+    def fit_chunked(self, chunks: Iterable[Matrix]) -> "MultivariateAmputation":
+        """Fits amputer on complete data that is passed in chunks, e.g. too large to fit in memory.
+
+        This is the first of two passes over the data. It gathers the standardization statistics and a uniform sample of (at most `sketch_size`) rows, on which the weighted sum scores are standardized and the shifts of the score to probability functions are calibrated per pattern.
+        In the second pass, :meth:`transform_chunked` (or ``transform`` on each chunk) amputes the chunks with this global calibration, so that `prop` is met over the complete data while memory is bounded by the chunk size.
+
+        Parameters
+        ----------
+        chunks : Iterable[Matrix]
+            Chunks of rows of shape `(n_i, m)`, for instance an iterator of arrays or DataFrames or ``pandas.read_csv(..., chunksize=...)``.
+            The same requirements apply as to `X` in ``fit``.
+        """
+        self._reset_stream()
+        for chunk in chunks:
+            self.partial_fit(chunk)
+        if self._sketch is not None:
+            self._update_reference_calibration()
+
         return self
 
-    def transform(self, X: Matrix, y: ArrayLike = None) -> Matrix:
+    def transform_chunked(self, chunks: Iterable[Matrix]) -> Iterator[Matrix]:
+        """Masks data that is passed in chunks and yields the incomplete chunks one by one.
+
+        Requires the amputer to be fitted with :meth:`fit_chunked` (or :meth:`partial_fit`), so every chunk is amputed with the same calibration.
+
+        Parameters
+        ----------
+        chunks : Iterable[Matrix]
+            Chunks of rows of shape `(n_i, m)`, for instance an iterator of arrays or DataFrames or ``pandas.read_csv(..., chunksize=...)``.
+
+        Returns
+        -------
+        chunks_incomplete : Iterator[Matrix]
+            Incomplete chunks masked according to parameters.
+        """
+        assert self.reference_calibration is not None, (
+            "Chunks can only be amputed consistently after fitting on all of them "
+            "with fit_chunked or partial_fit."
+        )
+        # every chunk gets its own random stream, so chunks are not amputed
+        # with the same draws
+        seed_sequence = np.random.SeedSequence(self.seed)
+        for chunk in chunks:
+            yield self._transform(chunk, seed_sequence.spawn(1)[0])
+
+    def _update_reference_calibration(self, budget: Optional[int] = None):
+        """
+        Keeps the calibration of every pattern on all rows sampled by
+        partial_fit, rather than on the rows assigned to it, up to date.
+
+        A full calibration costs `O(sketch_size * k)`, so it is only redone
+        once ``RECALIBRATION_FRACTION`` of the sample has been replaced, and
+        spread over the calls that follow: each scores `budget` rows of the
+        sample, and the shifts are replaced once all rows are scored. A
+        `budget` of None calibrates on the sample at once. In between, only
+        the means and standard deviations of the wss are updated, from the
+        moments of the sample in `O(k * m^2)`, which keeps the work per batch
+        linear in its size.
+        """
+        num_sampled = len(self._sketch.sample)
+        if budget is None or self.reference_calibration is None:
+            self.reference_calibration = self._calibrate(
+                *self._sumscores_per_pattern(self._sketch.sample)
+            )
+            self._calibrated_changes = self._sketch.changes
+            self._pending_calibration = None
+            return
+
+        pending = self._pending_calibration
+        if (
+            pending is None
+            and self._sketch.changes - self._calibrated_changes
+            >= RECALIBRATION_FRACTION * num_sampled
+        ):
+            # rows replaced while scoring are still rows of the sample, so
+            # scoring the live sample needs no snapshot of it
+            weights, offsets = self._standardized_weights()
+            pending = PendingCalibration(
+                weights,
+                offsets,
+                np.empty((num_sampled, self.num_patterns)),
+                0,
+                self._sketch.changes,
+            )
+        if pending is not None:
+            start = pending.position
+            end = min(start + budget, len(pending.scores))
+            pending.scores[start:end] = (
+                self._sketch.sample[start:end] @ pending.weights.T - pending.offsets
+            )
+            pending = pending._replace(position=end)
+            if end == len(pending.scores):
+                self.reference_calibration = self._calibrate(
+                    *self._score_segments(pending.scores)
+                )
+                self._calibrated_changes = pending.changes
+                pending = None
+        self._pending_calibration = pending
+
+        weights, offsets = self._standardized_weights()
+        wss_stds = np.sqrt(
+            np.maximum(
+                np.einsum("ki,ij,kj->k", weights, self._sketch.sample_cov, weights),
+                0,
+            )
+        )
+        wss_stds[wss_stds == 0] = 1
+        self.reference_calibration = self.reference_calibration._replace(
+            wss_means=weights @ self._sketch.sample_mean - offsets,
+            wss_stds=wss_stds,
+        )
+
+    def _pattern_calibration(
+        self,
+        scores: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+        distinct_counts: Optional[np.ndarray] = None,
+    ) -> PatternCalibration:
+        """
+        Reference calibration if there is one, else calibrates on the scores,
+        given as ``(wss, groups, order, bounds)``.
+        """
+        if self.reference_calibration is None:
+            return self._calibrate(*scores, distinct_counts)
+        return self.reference_calibration
+
+    def _sumscores_per_pattern(
+        self, involved_data: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Weighted sum scores of all rows under every pattern, laid out as one
+        segment of `n` scores per pattern. Returns the scores together with
+        the pattern, order and segment bounds of each score.
+        """
+        weights, offsets = self._standardized_weights()
+        return self._score_segments(
+            (involved_data @ weights.T.astype(involved_data.dtype))
+            - offsets.astype(involved_data.dtype)
+        )
+
+    def _score_segments(
+        self, scores: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Lays out `scores` of shape `(n, k)` as in :meth:`_sumscores_per_pattern`.
+        """
+        num_samples = scores.shape[0]
+        wss = scores.T.ravel()
+        return (
+            wss,
+            np.repeat(np.arange(self.num_patterns), num_samples),
+            np.arange(len(wss)),
+            np.arange(self.num_patterns + 1) * num_samples,
+        )
+
+    def _choose_candidates(
+        self,
+        X: Matrix,
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        diagnostics: bool = False,
+        validate: bool = True,
+    ) -> Tuple[ArrayLike, ArrayLike, Optional[AmputationDiagnostics]]:
+        """
+        Assigns every data row (sample) to a pattern and decides which rows
+        will be amputed. Returns the pattern index per row, a boolean array
+        that is True for the chosen candidates and, if ``diagnostics``, the
+        scores and probabilities per pattern. Neither X nor the amputer is
+        modified, so concurrent calls are safe.
+        Patterns are calibrated on the rows assigned to them, unless
+        ``calibrate_props`` was called on X for `prop`, in which case its
+        scores and calibration over all rows are reused, or the amputer holds
+        a reference calibration.
+
+        Random draws come from ``seed_sequence``, by default built from
+        ``self.seed``. It is spawned into one child per block of rows, which
+        is spawned into a stream for the pattern assignment and an independent
+        stream per pattern for the draws that decide which rows are amputed.
+        With exact assignment, the permutation of all rows is drawn from one
+        more child, spawned after the blocks. With exact selection, the
+        uniform draws of the rows are turned into keys for weighted sampling
+        without replacement within each pattern.
+        """
+        sweep_idx = self._prop_sweep_index(X)
+        # the sweep was made on validated data
+        X, distinct_counts = self._validate_data_with_counts(
+            X, validate and sweep_idx is None
+        )
+        num_samples = X.shape[0]
+
+        # if seed is None it will be random.
+        if seed_sequence is None:
+            seed_sequence = np.random.SeedSequence(self.seed)
+        block_seed_sequences = [
+            block_seed_sequence.spawn(1 + self.num_patterns)
+            for block_seed_sequence in seed_sequence.spawn(
+                -(-num_samples // ROW_BLOCK_SIZE)
+            )
+        ]
+
+        # split complete_data in groups
+        # the number of groups is defined by the number of patterns
+        if self.assignment == "exact":
+            (assigned_group_number, group_order, group_bounds) = permutation_segments(
+                np.random.default_rng(seed_sequence.spawn(1)[0]).permutation(
+                    num_samples
+                ),
+                exact_group_counts(self.freqs, num_samples),
+            )
+        else:
+            assigned_group_number = np.empty(num_samples, dtype=int)
+
+            def assign_block(rows: slice):
+                block_idx = rows.start // ROW_BLOCK_SIZE
+                assigned_group_number[rows] = np.random.default_rng(
+                    block_seed_sequences[block_idx][0]
+                ).choice(
+                    a=self.num_patterns, size=rows.stop - rows.start, p=self.freqs
+                )
+
+            map_row_blocks(assign_block, num_samples, self.n_jobs)
+            group_order, group_bounds = group_segments(
+                assigned_group_number, self.num_patterns
+            )
+
+        # calculate weighted sum scores for each sample in its group
+        if sweep_idx is not None:
+            # the sweep holds the scores of every row under every pattern
+            wss = self.prop_sweep.scores[0].reshape(self.num_patterns, num_samples)[
+                assigned_group_number, np.arange(num_samples)
+            ]
+        else:
+            wss = self._calculate_sumscores(X, assigned_group_number)
+        # define candidate probabilities per group
+        scores = (wss, assigned_group_number, group_order, group_bounds)
+        probs = self._choose_probabilities(
+            *scores,
+            self.prop_sweep.calibrations[sweep_idx]
+            if sweep_idx is not None
+            else self._pattern_calibration(scores, distinct_counts),
+        )
+        # apply probabilities and choose cases, with a stream per pattern
+        chosen_candidates = np.empty(num_samples, dtype=bool)
+        # exact selection compares the draws within each pattern afterwards
+        uniforms = np.empty(num_samples) if self.selection == "exact" else None
+
+        def choose_block(rows: slice):
+            block_idx = rows.start // ROW_BLOCK_SIZE
+            pattern_seed_sequences = block_seed_sequences[block_idx][1:]
+            block_order, block_bounds = group_segments(
+                assigned_group_number[rows], self.num_patterns
+            )
+            block_uniforms = (
+                np.empty(rows.stop - rows.start) if uniforms is None else uniforms[rows]
+            )
+            for pattern_idx in np.flatnonzero(np.diff(block_bounds)):
+                pattern_rows = block_order[
+                    block_bounds[pattern_idx] : block_bounds[pattern_idx + 1]
+                ]
+                block_uniforms[pattern_rows] = np.random.default_rng(
+                    pattern_seed_sequences[pattern_idx]
+                ).random(len(pattern_rows))
+            if uniforms is None:
+                chosen_candidates[rows] = block_uniforms < probs[rows]
+
+        map_row_blocks(choose_block, num_samples, self.n_jobs)
+        if uniforms is not None:
+            chosen_candidates = self._choose_exact(
+                uniforms, probs, group_order, group_bounds
+            )
+
+        if not diagnostics:
+            return assigned_group_number, chosen_candidates, None
+        return (
+            assigned_group_number,
+            chosen_candidates,
+            AmputationDiagnostics(
+                assigned_group_number,
+                np.split(wss[group_order], group_bounds[1:-1]),
+                np.split(probs[group_order], group_bounds[1:-1]),
+            ),
+        )
+
+    def _choose_exact(
+        self,
+        uniforms: np.ndarray,
+        probs: np.ndarray,
+        group_order: np.ndarray,
+        group_bounds: np.ndarray,
+    ) -> np.ndarray:
+        """
+        Chooses ``round(prop * n_k)`` of the `n_k` rows of every pattern,
+        without replacement and with probability proportional to ``probs``.
+        """
+        chosen_candidates = np.zeros(len(probs), dtype=bool)
+        for pattern_idx in range(len(group_bounds) - 1):
+            group_indices = group_order[
+                group_bounds[pattern_idx] : group_bounds[pattern_idx + 1]
+            ]
+            chosen_candidates[
+                group_indices[
+                    weighted_choice_exact(
+                        uniforms[group_indices],
+                        probs[group_indices],
+                        round(self.prop * len(group_indices)),
+                    )
+                ]
+            ] = True
+        return chosen_candidates
+
+    def _missing_mask(
+        self,
+        assigned_group_number: ArrayLike,
+        chosen_candidates: ArrayLike,
+        packed: bool = False,
+    ) -> ArrayLike:
+        """
+        Builds the missingness indicator of shape `(n, m)` from the pattern of
+        each row and whether it was chosen, or its bit-packed form of shape
+        `(n, ceil(m / 8))` (see ``np.packbits``) without building the dense
+        mask first.
+        """
+        amputed_var_indicator = ~self.observed_var_indicator
+        if packed:
+            amputed_var_indicator = np.packbits(amputed_var_indicator, axis=1)
+        missing_mask = amputed_var_indicator[assigned_group_number]
+        missing_mask[~chosen_candidates] = 0
+        return missing_mask
+
+    def transform(
+        self,
+        X: Matrix,
+        y: ArrayLike = None,
+        return_diagnostics: bool = False,
+        validate: bool = True,
+    ) -> Union[Matrix, Tuple[Matrix, AmputationDiagnostics]]:
         """Masks data according to the desired pattern and returns the incomplete data X.
 
         Parameters
@@ -912,57 +2005,327 @@ class MultivariateAmputation(TransformerMixin, BaseEstimator):
             Ignored. 
             Not used, present here for consistency.
 
+        return_diagnostics : bool, default : False
+            Whether to also return the pattern assignment, weighted sum scores and probabilities of this call.
+            The amputer itself is never modified by ``transform``, also not after ``partial_fit``, so a fitted amputer can be shared by threads.
+
+        validate : bool, default : True
+            Whether to look for non-numeric and binary vars among the vars involved in amputation.
+            These checks are skipped anyway for the data passed to ``fit``, recognized by a fingerprint of its dtypes and a sample of its rows.
+            Pass False to skip them for other data that is known to be valid, e.g. when amputing the same data many times.
+            The involved vars are checked to be complete in any case.
+
         Returns
         -------
         X_incomplete : Matrix
             Matrix of shape `(n, m)`.
             Incomplete data masked according to parameters.
-        """
+            If ``copy=False``, this is X itself.
 
-        # Reset wss and props per pattern
-        self.wss_per_pattern = []
-        self.probs_per_pattern = []
+        diagnostics : AmputationDiagnostics
+            Only if `return_diagnostics`.
+            Pattern index per row, and weighted sum scores and probabilities per pattern.
+        """
+        return self._transform(X, self._stream_seed(X), return_diagnostics, validate)
 
-        X = self._validate_data(X)
-        num_samples = X.shape[0]
+    def _stream_seed(self, X: Matrix) -> Optional[np.random.SeedSequence]:
+        """
+        Seed sequence of a batch of a stream fitted with partial_fit, None for
+        the seed sequence of a standalone transform.
 
-        # split complete_data in groups
-        # the number of groups is defined by the number of patterns
-        X_incomplete = X.copy()
-        X_indices = np.arange(num_samples)
-        # set seed for choice, if None it will be random.
-        np.random.seed(self.seed)
-        self.assigned_group_number = np.random.choice(
-            a=self.num_patterns, size=num_samples, p=self.freqs
+        It is derived from `seed`, the number of rows fitted so far and a hash
+        of (at most) 64 evenly spaced rows of X rather than spawned, so that
+        transform leaves the amputer as it is.
+        """
+        if self._stream_seed_sequence is None:
+            return None
+        rows = np.unique(
+            np.linspace(0, max(X.shape[0] - 1, 0), 64).astype(int)
+        )[: X.shape[0]]
+        sample = X.iloc[rows] if isinstance(X, DataFrame) else DataFrame(X[rows])
+        row_hashes = hash_pandas_object(sample, index=False).to_numpy()
+        return np.random.SeedSequence(
+            self._stream_seed_sequence.entropy,
+            spawn_key=(
+                self._sketch.count,
+                *X.shape,
+                *row_hashes.view(np.uint32).tolist(),
+            ),
         )
 
-        # start a loop over each pattern
-        for pattern_idx in range(self.num_patterns):
-            # assign cases to the group
-            group_indices = X_indices[self.assigned_group_number == pattern_idx]
-            pattern = np.squeeze(
-                np.asarray(self.observed_var_indicator[pattern_idx, :])
-            )
-            data_group = (
-                X[group_indices] if isinstance(X, np.ndarray) else X.iloc[group_indices]
-            )
-            # calculate weighted sum scores for each sample in the group
-            self._calculate_sumscores(data_group, pattern_idx)
-            # define candidate probabilities in group
-            probs = self._choose_probabilities(pattern_idx)
-            # apply probabilities and choose cases
-            # set seed for random binomial
-            np.random.seed(self.seed)
-            chosen_candidates = np.random.binomial(
-                n=1, size=data_group.shape[0], p=probs
-            )
-            # apply missing data pattern
-            chosen_indices = group_indices[chosen_candidates == 1]
-            if isinstance(X_incomplete, np.ndarray):
-                X_incomplete[chosen_indices] = np.where(
-                    pattern == 0, np.nan, X_incomplete[chosen_indices]
+    def _transform(
+        self,
+        X: Matrix,
+        seed_sequence: Optional[np.random.SeedSequence] = None,
+        return_diagnostics: bool = False,
+        validate: bool = True,
+    ) -> Union[Matrix, Tuple[Matrix, AmputationDiagnostics]]:
+        """Amputes X with the random streams of ``seed_sequence``, see ``transform``."""
+        if not self.copy:
+            self._validate_inplace(X)
+        (
+            assigned_group_number,
+            chosen_candidates,
+            diagnostics,
+        ) = self._choose_candidates(X, seed_sequence, return_diagnostics, validate)
+        # apply missing data patterns per block of rows
+        if isinstance(X, np.ndarray):
+            X_incomplete = np.empty_like(X) if self.copy else X
+
+            def mask_block(rows: slice):
+                if self.copy:
+                    X_incomplete[rows] = X[rows]
+                np.putmask(
+                    X_incomplete[rows],
+                    self._missing_mask(
+                        assigned_group_number[rows], chosen_candidates[rows]
+                    ),
+                    np.nan,
                 )
+
+            map_row_blocks(mask_block, X.shape[0], self.n_jobs)
+        else:
+            missing_mask = self._missing_mask(assigned_group_number, chosen_candidates)
+            if self.copy:
+                X_incomplete = X.mask(missing_mask)
             else:
-                X_incomplete.iloc[chosen_indices, pattern == 0] = np.nan
+                # blocks without any values to mask are left untouched
+                X.mask(missing_mask, inplace=True)
+                X_incomplete = X
 
+        if return_diagnostics:
+            return X_incomplete, diagnostics
         return X_incomplete
+
+    def transform_mask(
+        self, X: Matrix, packed: bool = False, validate: bool = True
+    ) -> Union[np.ndarray, CompactMask]:
+        """Returns where ``transform`` would place missing values, without touching or copying X.
+
+        The mask can be applied lazily later on, e.g. with ``np.where(mask, np.nan, X)`` or ``X.mask(mask)`` for a DataFrame.
+
+        Parameters
+        ----------
+        X : Matrix
+            Matrix of shape `(n, m)`
+            Complete input data, where `n` is the number of data rows (samples) and `m` is the number of features (column, variables).
+            Data cannot contain missing values and should be numeric,
+            or will be forced to be numeric.
+
+        packed : bool, default : False
+            Whether to return the mask bit-packed along the columns as a :class:`~pyampute.compact_mask.CompactMask`.
+            This takes one bit instead of one byte per value.
+
+        validate : bool, default : True
+            Whether to validate X, see ``transform``.
+
+        Returns
+        -------
+        mask : Union[np.ndarray, CompactMask]
+            Boolean array of shape `(n, m)` that is True for values that are amputed.
+            If `packed`, the same mask as a :class:`~pyampute.compact_mask.CompactMask`.
+        """
+        assigned_group_number, chosen_candidates, _ = self._choose_candidates(
+            X, self._stream_seed(X), validate=validate
+        )
+        missing_mask = self._missing_mask(
+            assigned_group_number, chosen_candidates, packed
+        )
+        if packed:
+            return CompactMask(missing_mask, self.num_features)
+        return missing_mask
+
+    def calibrate_props(self, X: Matrix, props: ArrayLike) -> np.ndarray:
+        """Calibrates the score to probability functions for a sweep of missingness proportions at once.
+
+        Validation, weighted sum scores and their standardization are computed once, for every data row under every pattern as in :meth:`sample_masks`, and the shifts for all proportions are solved together in one vectorized pass over them (or read from the lookup table, see `calibration`).
+        The scores and calibrations are kept in `prop_sweep`, so that after setting `prop` to any of `props`, :meth:`sample_masks` on the same X only draws the masks, and ``transform`` on the same X reuses the scores and the calibration over all rows instead of calibrating on the rows assigned to each pattern.
+
+        Parameters
+        ----------
+        X : Matrix
+            Matrix of shape `(n, m)`
+            Complete input data, with the same requirements as for :meth:`sample_masks`.
+
+        props : ArrayLike
+            Missingness proportions `P` between 0 and 1 to calibrate for.
+
+        Returns
+        -------
+        shifts : np.ndarray
+            Array of shape `(P, k)` with the shift of the score to probability function of every pattern for every proportion.
+            Patterns that are not shifted have shift 0.
+        """
+        props = np.asarray(props, dtype=float).ravel()
+        assert len(props) > 0 and ((props >= 0) & (props <= 1)).all(), (
+            "props must be proportions between 0 and 1."
+        )
+        X_validated, distinct_counts = self._validate_data_with_counts(X)
+        scores = self._sumscores_per_pattern(
+            self._involved_numeric_data(
+                X_validated, self._computation_dtype(X_validated)
+            )
+        )
+        wss, _, group_order, group_bounds = scores
+        wss_means, wss_stds, constant, shifted_patterns = self._calibration_statistics(
+            *scores, distinct_counts
+        )
+        shifts = np.zeros((len(props), self.num_patterns))
+        shifts[:, shifted_patterns] = self._calculate_shift_grid(
+            wss, group_order, group_bounds, wss_means, wss_stds, shifted_patterns, props
+        ).T
+        self.prop_sweep = PropSweep(
+            self._fingerprint(X, num_rows=None),
+            props,
+            scores,
+            [
+                PatternCalibration(wss_means, wss_stds, prop_shifts, constant)
+                for prop_shifts in shifts
+            ],
+        )
+        return shifts
+
+    def sample_masks(
+        self, X: Matrix, n_replicates: int, as_generator: bool = False
+    ) -> Union[np.ndarray, Iterator[CompactMask]]:
+        """Draws the masks of many independent amputations of the same data at once.
+
+        Validation, numeric enforcement, standardization, weighted sum scores and the shift of the probability functions are computed once, for every data row under every pattern.
+        Only the assignment of rows to patterns and the choice of candidates are drawn per replicate.
+        Since the probabilities do not depend on the assignment, weighted sum scores are standardized over all rows instead of within the rows assigned to a pattern, which gives the same distribution for a random assignment.
+
+        Parameters
+        ----------
+        X : Matrix
+            Matrix of shape `(n, m)`
+            Complete input data, where `n` is the number of data rows (samples) and `m` is the number of features (column, variables).
+            Data cannot contain missing values and should be numeric,
+            or will be forced to be numeric.
+
+        n_replicates : int
+            Number of masks `R` to draw.
+
+        as_generator : bool, default : False
+            Whether to yield the masks one by one as :class:`~pyampute.compact_mask.CompactMask`, instead of returning all of them at once.
+
+        Returns
+        -------
+        masks : Union[np.ndarray, Iterator[CompactMask]]
+            uint8 array of shape `(R, n, ceil(m / 8))` with the bit-packed masks (``CompactMask(masks[r], m)`` wraps replicate `r`),
+            or a generator of `R` :class:`~pyampute.compact_mask.CompactMask`.
+        """
+        probs = self._probabilities_per_pattern(X)
+        # one independent stream per replicate, if seed is None it will be random.
+        replicate_seed_sequences = np.random.SeedSequence(self.seed).spawn(n_replicates)
+        blocks = self._sample_packed_masks(probs, replicate_seed_sequences)
+        if as_generator:
+            return (
+                CompactMask(mask, self.num_features) for block in blocks for mask in block
+            )
+        masks = np.empty(
+            (n_replicates, X.shape[0], -(-self.num_features // 8)), dtype=np.uint8
+        )
+        start = 0
+        for block in blocks:
+            masks[start : start + len(block)] = block
+            start += len(block)
+        return masks
+
+    def _probabilities_per_pattern(self, X: Matrix) -> np.ndarray:
+        """
+        Missingness probabilities of every data row under every pattern, of
+        shape `(k, n)`, from weighted sum scores standardized over all rows.
+        """
+        num_samples = X.shape[0]
+        sweep_idx = self._prop_sweep_index(X)
+        if sweep_idx is not None:
+            # only the shape, the columns and missing values are checked
+            self._validate_data_with_counts(X, validate=False)
+            scores = self.prop_sweep.scores
+            calibration = self.prop_sweep.calibrations[sweep_idx]
+        else:
+            X, distinct_counts = self._validate_data_with_counts(X)
+            scores = self._sumscores_per_pattern(
+                self._involved_numeric_data(X, self._computation_dtype(X))
+            )
+            calibration = self._pattern_calibration(scores, distinct_counts)
+        probs = self._choose_probabilities(*scores, calibration)
+        return probs.reshape(self.num_patterns, num_samples)
+
+    def _prop_sweep_index(self, X: Matrix) -> Optional[int]:
+        """
+        Index of `prop` in the sweep of ``calibrate_props`` if the sweep was
+        made on X, else None.
+        """
+        if self.prop_sweep is None:
+            return None
+        matches = np.flatnonzero(np.isclose(self.prop_sweep.props, self.prop))
+        # the cached scores are only valid for exactly the same values, so all
+        # rows are hashed rather than a sample
+        if len(matches) == 0 or self.prop_sweep.fingerprint != self._fingerprint(
+            X, num_rows=None
+        ):
+            return None
+        return int(matches[0])
+
+    def _sample_packed_masks(
+        self,
+        probs: np.ndarray,
+        replicate_seed_sequences: List[np.random.SeedSequence],
+        block_size: int = 2 ** 20,
+    ) -> Iterator[np.ndarray]:
+        """
+        Yields blocks of bit-packed masks of shape `(r, n, ceil(m / 8))`,
+        drawn vectorized over `r` replicates at a time such that a block
+        holds at most ``block_size`` mask rows. Replicate `i` is drawn from
+        ``replicate_seed_sequences[i]``. With exact assignment, the
+        permutation of a replicate is drawn after its uniforms.
+        """
+        n_replicates = len(replicate_seed_sequences)
+        num_samples = probs.shape[1]
+        packed_patterns = np.packbits(~self.observed_var_indicator, axis=1)
+        cumulative_freqs = np.cumsum(self.freqs)
+        exact_labels = np.repeat(
+            np.arange(self.num_patterns), exact_group_counts(self.freqs, num_samples)
+        )
+        sample_indices = np.arange(num_samples)
+        replicates_per_block = max(1, block_size // max(num_samples, 1))
+        for start in range(0, n_replicates, replicates_per_block):
+            num_replicates = min(replicates_per_block, n_replicates - start)
+            # every replicate has its own stream, so replicate r is the same
+            # no matter how many replicates are drawn
+            uniforms = np.empty((num_replicates, 2, num_samples))
+            rngs = [
+                np.random.default_rng(replicate_seed_sequences[start + replicate_idx])
+                for replicate_idx in range(num_replicates)
+            ]
+            for replicate_idx, rng in enumerate(rngs):
+                rng.random(out=uniforms[replicate_idx])
+            if self.assignment == "exact":
+                assigned_group_number = np.stack(
+                    [exact_labels[rng.permutation(num_samples)] for rng in rngs]
+                )
+            else:
+                assigned_group_number = np.minimum(
+                    np.searchsorted(cumulative_freqs, uniforms[:, 0], side="right"),
+                    self.num_patterns - 1,
+                )
+            replicate_probs = probs[assigned_group_number, sample_indices]
+            if self.selection == "exact":
+                chosen_candidates = np.stack(
+                    [
+                        self._choose_exact(
+                            uniforms[replicate_idx, 1],
+                            replicate_probs[replicate_idx],
+                            *group_segments(
+                                assigned_group_number[replicate_idx], self.num_patterns
+                            ),
+                        )
+                        for replicate_idx in range(num_replicates)
+                    ]
+                )
+            else:
+                chosen_candidates = uniforms[:, 1] < replicate_probs
+            masks = packed_patterns[assigned_group_number]
+            masks[~chosen_candidates] = 0
+            yield masks
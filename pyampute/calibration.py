@@ -0,0 +1,685 @@
+"""
+Solver for the horizontal shifts of the sigmoid score to probability
+functions, such that the mean missingness probability of the rows of every
+pattern meets its target proportion, the table of precomputed shifts that
+is shipped with the package and the tables built for custom functions.
+"""
+import argparse
+import functools
+import hashlib
+import io
+import logging
+import os
+import pkgutil
+import tempfile
+import types
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+
+from pyampute.utils import ArrayLike, map_row_blocks
+
+# Logit cutoff per sigmoid type as (sign, absolute, offset), such that
+# the logit is ``sign * (|wss| if absolute else wss) + offset + shift``.
+SIGMOID_CUTOFFS = {
+    "SIGMOID-RIGHT": (1, False, 0),
+    "SIGMOID-LEFT": (-1, False, 0),
+    "SIGMOID-TAIL": (1, True, -0.75),
+    "SIGMOID-MID": (-1, True, 0.75),
+}
+
+
+# package and resource name of the shift lookup table
+LOOKUP_TABLE_RESOURCE = ("pyampute", "data/shift_lookup.npz")
+# seed of the normal sample the packaged lookup table is generated on
+LOOKUP_TABLE_SEED = 2022
+
+
+class ShiftLookupTable(NamedTuple):
+    """
+    Shifts of the prespecified sigmoid functions that give missingness
+    proportion ``props[j]`` for standard normal weighted sum scores, of shape
+    `(len(functions), len(props))`.
+    """
+
+    functions: Tuple[str, ...]
+    props: np.ndarray
+    shifts: np.ndarray
+
+    def shift(self, probability_func: str, prop: float) -> float:
+        """Shift of ``probability_func``, interpolated between the tabulated props."""
+        shifts = self.shifts[self.functions.index(probability_func)]
+        return float(np.interp(prop, self.props, shifts))
+
+
+def lookup_table_path() -> str:
+    """Location of the shift lookup table in the installed package."""
+    return os.path.join(os.path.dirname(__file__), *LOOKUP_TABLE_RESOURCE[1].split("/"))
+
+
+@lru_cache(maxsize=None)
+def load_shift_lookup_table() -> ShiftLookupTable:
+    """
+    Reads the shift lookup table shipped with the package. It is read once
+    per process and shared by all amputers, so it must not be modified.
+    """
+    # pkgutil also reads resources from zipped packages, on every Python 3
+    with np.load(io.BytesIO(pkgutil.get_data(*LOOKUP_TABLE_RESOURCE))) as table:
+        shifts = table["shifts"]
+        shifts.flags.writeable = False
+        return ShiftLookupTable(tuple(table["functions"]), table["props"], shifts)
+
+
+def save_shift_lookup_table(table: ShiftLookupTable, path, **metadata: Any) -> None:
+    """
+    Writes a shift lookup table in the format read by
+    ``load_shift_lookup_table``, with ``metadata`` (e.g. the seed and range
+    it was generated with) stored as extra arrays that loading ignores.
+    """
+    np.savez(
+        path,
+        functions=np.array(table.functions),
+        props=table.props,
+        shifts=table.shifts,
+        **{key: np.asarray(value) for key, value in metadata.items()},
+    )
+
+
+def sigmoid_logits(wss_standardized: ArrayLike, probability_func: str) -> np.ndarray:
+    """Unshifted logits of a prespecified sigmoid for standardized wss."""
+    sign, absolute, offset = SIGMOID_CUTOFFS[probability_func]
+    scores = np.absolute(wss_standardized) if absolute else wss_standardized
+    # python scalars keep the dtype of the scores
+    return sign * scores + float(offset)
+
+
+def _sigmoid_inplace(X: np.ndarray) -> np.ndarray:
+    np.negative(X, out=X)
+    np.exp(X, out=X)
+    X += 1
+    return np.reciprocal(X, out=X)
+
+
+def histogram_logits(logits: np.ndarray, bins: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compresses logits into ``bins`` equal-width bins. Returns the mean logit
+    (the center for empty bins) and the number of logits of every bin, so the
+    mean of a smooth function of the logits is approximated to second order
+    in the bin width.
+    """
+    lowest, highest = logits.min(), logits.max()
+    width = (highest - lowest) / bins if highest > lowest else 1
+    bin_indices = ((logits - lowest) / width).astype(np.intp)
+    # the highest logit is in the last bin
+    np.minimum(bin_indices, bins - 1, out=bin_indices)
+    counts = np.bincount(bin_indices, minlength=bins)
+    sums = np.bincount(bin_indices, weights=logits, minlength=bins)
+    centers = lowest + (np.arange(bins) + 0.5) * width
+    with np.errstate(invalid="ignore"):
+        means = np.where(counts > 0, sums / counts, centers)
+    return means.astype(logits.dtype), counts
+
+
+def solve_shifts(
+    logits: np.ndarray,
+    bounds: ArrayLike,
+    targets: ArrayLike,
+    lower_range: float,
+    upper_range: float,
+    max_iter: int,
+    max_diff_with_target: float,
+    weights: Optional[np.ndarray] = None,
+    initial_shifts: Optional[ArrayLike] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Finds, for all groups at once, the shift :math:`b_g` for which the mean of
+    ``sigmoid(logits + b_g)`` over the rows of group `g` is within
+    ``max_diff_with_target`` of ``targets[g]``. The logits of group `g` are
+    the segment ``logits[bounds[g]:bounds[g + 1]]``, optionally weighted by
+    ``weights``, e.g. the counts of a histogram of the logits.
+
+    The mean is increasing in the shift, with derivative the mean of
+    :math:`p (1 - p)`. Every iteration takes a Newton step per group and
+    falls back to bisection when the step leaves the bracket of shifts
+    known to be too low and too high, which starts as
+    ``[lower_range, upper_range]``. Like a binary search, the first shift
+    is the middle of the range, unless ``initial_shifts`` are given (e.g.
+    from a lookup table), and the probabilities are evaluated at most
+    ``max_iter - 1`` times. Only the groups that have not converged yet are
+    evaluated, in a buffer of probabilities that is allocated once.
+
+    Returns the shifts and the number of evaluations per group.
+    """
+    bounds = np.asarray(bounds)
+    num_groups = len(bounds) - 1
+    targets = np.broadcast_to(np.asarray(targets, dtype=float), (num_groups,))
+    lower = np.full(num_groups, float(lower_range))
+    upper = np.full(num_groups, float(upper_range))
+    if initial_shifts is None:
+        shifts = lower + (upper - lower) / 2
+    else:
+        shifts = np.clip(np.asarray(initial_shifts, dtype=float), lower, upper)
+    # groups without rows have nothing to calibrate
+    active = np.diff(bounds) > 0
+    iterations = np.zeros(num_groups, dtype=int)
+
+    probs = np.empty_like(logits)
+    errors = np.zeros(num_groups)
+    derivatives = np.zeros(num_groups)
+    if weights is None:
+        totals = np.diff(bounds).astype(float)
+    else:
+        totals = np.array(
+            [
+                weights[bounds[group_idx] : bounds[group_idx + 1]].sum()
+                for group_idx in range(num_groups)
+            ],
+            dtype=float,
+        )
+    for _ in range(max_iter - 1):
+        for group_idx in np.flatnonzero(active):
+            rows = slice(bounds[group_idx], bounds[group_idx + 1])
+            group_probs = np.add(
+                logits[rows], logits.dtype.type(shifts[group_idx]), out=probs[rows]
+            )
+            _sigmoid_inplace(group_probs)
+            # accumulated in float64, also for float32 probabilities
+            if weights is None:
+                mean = group_probs.sum(dtype=np.float64)
+                second_moment = np.dot(group_probs, group_probs)
+            else:
+                weighted_probs = weights[rows] * group_probs
+                mean = weighted_probs.sum(dtype=np.float64)
+                second_moment = np.dot(weighted_probs, group_probs)
+            mean /= totals[group_idx]
+            errors[group_idx] = mean - targets[group_idx]
+            # mean of p (1 - p)
+            derivatives[group_idx] = mean - second_moment / totals[group_idx]
+        iterations += active
+
+        active &= np.absolute(errors) >= max_diff_with_target
+        if not active.any():
+            break
+        shifts, lower, upper = _safeguarded_newton_step(
+            shifts, lower, upper, errors, derivatives, active
+        )
+
+    return shifts, iterations
+
+
+def _safeguarded_newton_step(
+    shifts: np.ndarray,
+    lower: np.ndarray,
+    upper: np.ndarray,
+    errors: np.ndarray,
+    derivatives: np.ndarray,
+    active: np.ndarray,
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Narrows the brackets of the active shifts with the sign of their errors
+    and takes a Newton step, or bisects where the step leaves the bracket.
+    Returns the new shifts and brackets.
+    """
+    upper = np.where(active & (errors > 0), shifts, upper)
+    lower = np.where(active & (errors <= 0), shifts, lower)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        newton = shifts - errors / derivatives
+    in_bracket = (newton > lower) & (newton < upper)
+    shifts = np.where(
+        active, np.where(in_bracket, newton, lower + (upper - lower) / 2), shifts
+    )
+    return shifts, lower, upper
+
+
+def _mean_sigmoid_grid(
+    logits: np.ndarray,
+    shifts: np.ndarray,
+    active: np.ndarray,
+    n_jobs: Optional[int] = None,
+    weights: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Means of :math:`p` and :math:`p^2`, with ``p = sigmoid(logits[f] + shifts[f, j])``,
+    for every active cell of ``shifts`` of shape `(F, P)`, given one sample
+    of logits per row of ``logits`` of shape `(F, n)`, optionally weighted by
+    ``weights`` of the same shape. Blocks of samples are spread over
+    ``n_jobs`` threads and their sums are added in a fixed order.
+    """
+    num_funcs, num_samples = logits.shape
+    totals = (
+        np.full((num_funcs, 1), float(num_samples))
+        if weights is None
+        else weights.sum(axis=1, keepdims=True, dtype=float)
+    )
+    # at most 2 ** 20 probabilities per block
+    block_size = max(1, 2 ** 20 // shifts.shape[1])
+    sums = np.zeros((-(-num_samples // block_size), 2) + shifts.shape)
+
+    def sum_block(rows: slice):
+        block_sums = sums[rows.start // block_size]
+        for func_idx in range(num_funcs):
+            cells = np.flatnonzero(active[func_idx])
+            probs = logits[func_idx, rows] + shifts[func_idx, cells, None]
+            _sigmoid_inplace(probs)
+            if weights is None:
+                block_sums[0, func_idx, cells] = probs.sum(axis=1)
+                block_sums[1, func_idx, cells] = np.einsum("ij,ij->i", probs, probs)
+            else:
+                block_sums[0, func_idx, cells] = probs @ weights[func_idx, rows]
+                probs *= probs
+                block_sums[1, func_idx, cells] = probs @ weights[func_idx, rows]
+
+    map_row_blocks(sum_block, num_samples, n_jobs, block_size)
+    means, second_moments = sums.sum(axis=0) / totals
+    return means, second_moments
+
+
+def solve_shift_grid(
+    logits: np.ndarray,
+    targets: ArrayLike,
+    lower_range: float,
+    upper_range: float,
+    max_iter: int,
+    max_diff_with_target: float,
+    n_jobs: Optional[int] = None,
+    weights: Optional[np.ndarray] = None,
+    initial_shifts: Optional[np.ndarray] = None,
+) -> np.ndarray:
+    """
+    Shifts for every function (row of ``logits``, one sample of logits per
+    function, optionally weighted by ``weights``) and every target
+    proportion, of shape `(F, P)`. All cells are
+    solved at once with the iteration of ``solve_shifts``, evaluating only
+    the cells that have not converged yet, starting from ``initial_shifts``
+    if given. Targets that cannot be met within the range get the nearest
+    bound of the range right away.
+    """
+    targets = np.asarray(targets, dtype=float)
+    shape = (logits.shape[0], len(targets))
+    lower = np.full(shape, float(lower_range))
+    upper = np.full(shape, float(upper_range))
+    shifts = (
+        lower + (upper - lower) / 2
+        if initial_shifts is None
+        else np.clip(np.asarray(initial_shifts, dtype=float), lower, upper)
+    )
+
+    range_means, _ = _mean_sigmoid_grid(
+        logits,
+        np.tile([float(lower_range), float(upper_range)], (shape[0], 1)),
+        np.ones((shape[0], 2), dtype=bool),
+        n_jobs,
+        weights,
+    )
+    below_range = targets <= range_means[:, :1]
+    above_range = targets >= range_means[:, 1:]
+    shifts[below_range] = lower_range
+    shifts[above_range] = upper_range
+    active = ~(below_range | above_range)
+    for _ in range(max_iter - 1):
+        means, second_moments = _mean_sigmoid_grid(
+            logits, shifts, active, n_jobs, weights
+        )
+        errors = means - targets
+        active &= np.absolute(errors) >= max_diff_with_target
+        if not active.any():
+            break
+        shifts, lower, upper = _safeguarded_newton_step(
+            shifts, lower, upper, errors, means - second_moments, active
+        )
+    return shifts
+
+
+def custom_logits(
+    probability_func: Callable[[ArrayLike], ArrayLike], wss_standardized: ArrayLike
+) -> np.ndarray:
+    """
+    Logits of the probabilities of a custom score to probability function,
+    such that shifting them shifts the function like the prespecified
+    sigmoids. Probabilities of 0 and 1 are clipped to finite logits.
+    """
+    wss_standardized = np.asarray(wss_standardized)
+    dtype = (
+        wss_standardized.dtype
+        if np.issubdtype(wss_standardized.dtype, np.floating)
+        else np.float64
+    )
+    probs = np.squeeze(np.asarray(probability_func(wss_standardized), dtype=dtype))
+    eps = np.finfo(dtype).eps
+    probs = np.clip(probs, eps, 1 - eps)
+    return np.log(probs) - np.log1p(-probs)
+
+
+def unshifted_logits(
+    probability_func: Union[str, Callable[[ArrayLike], ArrayLike]],
+    wss_standardized: ArrayLike,
+) -> np.ndarray:
+    """Logits of a prespecified sigmoid or of a custom function."""
+    if isinstance(probability_func, str):
+        return sigmoid_logits(wss_standardized, probability_func)
+    return custom_logits(probability_func, wss_standardized)
+
+
+def _normal_logits(
+    functions: Tuple[Union[str, Callable[[ArrayLike], ArrayLike]], ...],
+    n_samples: int,
+    seed: Optional[int],
+) -> np.ndarray:
+    """Logits of every function for one standard normal sample of wss."""
+    wss = np.random.default_rng(seed).standard_normal(n_samples)
+    return np.stack([unshifted_logits(func, wss) for func in functions])
+
+
+def generate_shift_lookup_table(
+    prop_step: float = 0.01,
+    n_samples: int = 10 ** 6,
+    functions: Tuple[str, ...] = tuple(SIGMOID_CUTOFFS),
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+    bins: Optional[int] = 4096,
+    lower_range: float = -3,
+    upper_range: float = 3,
+    max_iter: int = 100,
+    max_diff_with_target: float = 1e-5,
+) -> ShiftLookupTable:
+    """
+    Computes the shifts of the sigmoid ``functions`` for the props
+    ``prop_step, 2 * prop_step, ..., 1`` on a sample of ``n_samples``
+    standard normal weighted sum scores. Custom functions are named by
+    their ``function_fingerprint`` in the table. The shifts are solved to a tighter
+    tolerance than amputation needs, which costs about one more Newton step,
+    so the table error is dominated by the sampling error.
+    Unless ``bins`` is None, the shifts are solved on a histogram of the
+    logits of every function (see ``histogram_logits``), which makes the
+    cost of an iteration independent of ``n_samples``.
+    """
+    props = np.round(np.arange(1, round(1 / prop_step) + 1) * prop_step, 10)
+    logits = _normal_logits(functions, n_samples, seed)
+    weights = None
+    if bins is not None:
+        histograms = [histogram_logits(func_logits, bins) for func_logits in logits]
+        logits, weights = map(np.stack, zip(*histograms))
+    shifts = solve_shift_grid(
+        logits,
+        props,
+        lower_range,
+        upper_range,
+        max_iter,
+        max_diff_with_target,
+        n_jobs,
+        weights,
+    )
+    names = tuple(
+        func if isinstance(func, str) else function_fingerprint(func)
+        for func in functions
+    )
+    return ShiftLookupTable(names, props, shifts)
+
+
+def check_shift_lookup_table(
+    table: ShiftLookupTable,
+    n_samples: int = 10 ** 6,
+    seed: Optional[int] = None,
+    n_jobs: Optional[int] = None,
+) -> np.ndarray:
+    """
+    Missingness proportion every shift of the table gives on a fresh sample
+    of standard normal weighted sum scores, minus its tabulated prop.
+    """
+    means, _ = _mean_sigmoid_grid(
+        _normal_logits(table.functions, n_samples, seed),
+        np.asarray(table.shifts, dtype=float),
+        np.ones(table.shifts.shape, dtype=bool),
+        n_jobs,
+    )
+    return means - table.props
+
+
+def function_fingerprint(func: Callable) -> str:
+    """
+    Stable hash of a function's code, default arguments, closure and the
+    current values of the globals it refers to, or of the function,
+    arguments and keywords of a ``functools.partial``, that is the same in
+    every process. Objects that are not functions, modules, numbers,
+    strings, arrays or containers of these are hashed by their ``repr``,
+    which is only stable if it does not contain a memory address, see
+    ``_stable_fingerprint``.
+    """
+    return _stable_fingerprint(func)[0]
+
+
+def _stable_fingerprint(func: Callable) -> Tuple[str, bool]:
+    """
+    Fingerprint of ``func`` and whether it is the same in every process,
+    i.e. no ``repr`` with a memory address went into it.
+    """
+    digest = hashlib.sha256()
+    stable = _update_fingerprint(digest, func)
+    return digest.hexdigest()[:24], stable
+
+
+def _global_names(code: types.CodeType) -> List[str]:
+    """Names the code and the code nested in it (e.g. lambdas) refer to."""
+    names = list(code.co_names)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            names.extend(_global_names(const))
+    return names
+
+
+def _update_fingerprint(digest: Any, obj: Any, depth: int = 0) -> bool:
+    update = functools.partial(_update_fingerprint, digest, depth=depth + 1)
+    digest.update(type(obj).__qualname__.encode())
+    if depth > 20:
+        # recursive closures
+        return True
+    if isinstance(obj, functools.partial):
+        return update(obj.func) & update(obj.args) & update(obj.keywords)
+    if isinstance(obj, types.MethodType):
+        return update(obj.__func__) & update(obj.__self__)
+    if isinstance(obj, types.FunctionType):
+        # globals are resolved now, so a changed module constant changes the
+        # fingerprint, names that are not globals (e.g. builtins) are skipped
+        referenced_globals = {
+            name: obj.__globals__[name]
+            for name in _global_names(obj.__code__)
+            if name in obj.__globals__
+        }
+        return (
+            update(obj.__code__)
+            & update(obj.__defaults__)
+            & update(obj.__kwdefaults__)
+            & update(tuple(cell.cell_contents for cell in obj.__closure__ or ()))
+            & update(referenced_globals)
+        )
+    if isinstance(obj, types.CodeType):
+        digest.update(obj.co_code)
+        return update(obj.co_consts) & update(obj.co_names)
+    if isinstance(obj, types.ModuleType):
+        digest.update(obj.__name__.encode())
+        return True
+    if isinstance(obj, np.ndarray):
+        digest.update(str((obj.dtype, obj.shape)).encode())
+        digest.update(np.ascontiguousarray(obj).tobytes())
+        return True
+    if isinstance(obj, (tuple, list)):
+        stable = True
+        for item in obj:
+            stable &= update(item)
+        return stable
+    if isinstance(obj, dict):
+        stable = True
+        for key in sorted(obj, key=repr):
+            stable &= update(key) & update(obj[key])
+        return stable
+    if isinstance(obj, (types.BuiltinFunctionType, np.ufunc)):
+        digest.update(f"{getattr(obj, '__module__', '')}.{obj.__name__}".encode())
+        return True
+    if callable(obj) and hasattr(obj, "__dict__") and not isinstance(obj, type):
+        # instances of classes with a __call__ method
+        return update(type(obj).__call__) & update(vars(obj))
+    representation = repr(obj)
+    digest.update(representation.encode())
+    return " at 0x" not in representation
+
+
+def shift_table_cache_dir() -> str:
+    """
+    Directory of the shift tables built for custom functions: the
+    ``PYAMPUTE_CACHE_DIR`` environment variable, or else ``pyampute`` in the
+    user's cache directory.
+    """
+    if "PYAMPUTE_CACHE_DIR" in os.environ:
+        return os.environ["PYAMPUTE_CACHE_DIR"]
+    cache_home = os.environ.get(
+        "XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")
+    )
+    return os.path.join(cache_home, "pyampute")
+
+
+_custom_shift_tables: Dict[str, ShiftLookupTable] = {}
+
+
+def _read_cached_shift_table(path: str) -> Optional[ShiftLookupTable]:
+    """Shift lookup table cached in ``path``, or None if it cannot be read."""
+    try:
+        with np.load(path) as cached:
+            return ShiftLookupTable(
+                tuple(cached["functions"]), cached["props"], cached["shifts"]
+            )
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def _write_cached_shift_table(table: ShiftLookupTable, path: str) -> None:
+    """Caches a shift lookup table in ``path``, warns if that fails."""
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write to a temporary file first, so readers never see a partial table
+        with tempfile.NamedTemporaryFile(
+            dir=os.path.dirname(path), suffix=".npz", delete=False
+        ) as temporary:
+            save_shift_lookup_table(table, temporary)
+        os.replace(temporary.name, path)
+    except OSError:
+        logging.warning(
+            f"Failed to cache the shift lookup table of a custom function in {path}."
+        )
+
+
+def custom_shift_table(
+    probability_func: Callable[[ArrayLike], ArrayLike],
+    lower_range: float = -3,
+    upper_range: float = 3,
+    **kwargs,
+) -> ShiftLookupTable:
+    """
+    Shift lookup table of a custom score to probability function. It is
+    built on first use with ``generate_shift_lookup_table`` (``kwargs`` are
+    passed on) and cached in memory and in ``shift_table_cache_dir()``,
+    keyed by the fingerprint of the function and the table parameters, so
+    other processes reuse it. Functions without a fingerprint that is the
+    same in every process are only cached in memory.
+    """
+    params = dict(prop_step=0.01, n_samples=10 ** 6, seed=0, bins=4096, max_iter=100)
+    params.update(kwargs, lower_range=lower_range, upper_range=upper_range)
+    key, stable = _stable_fingerprint((probability_func, sorted(params.items())))
+    if key in _custom_shift_tables:
+        return _custom_shift_tables[key]
+
+    path = os.path.join(shift_table_cache_dir(), f"shift_lookup_{key}.npz")
+    table = _read_cached_shift_table(path) if stable else None
+    if table is None:
+        logging.info(
+            "Building the shift lookup table of a custom score to probability function."
+        )
+        table = generate_shift_lookup_table(functions=(probability_func,), **params)
+        if stable:
+            _write_cached_shift_table(table, path)
+        else:
+            # a key that differs between processes would only fill the cache
+            logging.info(
+                "Not caching the shift lookup table on disk, since the custom "
+                "function has no fingerprint that is the same in every process."
+            )
+    table.shifts.flags.writeable = False
+    _custom_shift_tables[key] = table
+    return table
+
+
+def main(argv: Optional[List[str]] = None):
+    """Command line entry point that generates and checks the lookup table."""
+    parser = argparse.ArgumentParser(
+        description="Generate the shift lookup table of the sigmoid score to "
+        "probability functions."
+    )
+    parser.add_argument("--prop-step", type=float, default=0.01)
+    parser.add_argument("--n-samples", type=int, default=10 ** 6)
+    parser.add_argument(
+        "--seed",
+        type=int,
+        default=LOOKUP_TABLE_SEED,
+        help="seed of the normal sample, fixed so the table can be regenerated",
+    )
+    parser.add_argument(
+        "--lower-range", type=float, default=-3, help="lower bound of the shifts"
+    )
+    parser.add_argument(
+        "--upper-range", type=float, default=3, help="upper bound of the shifts"
+    )
+    parser.add_argument("--n-jobs", type=int, default=None)
+    parser.add_argument(
+        "--bins",
+        type=int,
+        default=4096,
+        help="number of histogram bins to solve on, 0 for the exact sample",
+    )
+    parser.add_argument(
+        "--check-samples",
+        type=int,
+        default=10 ** 6,
+        help="size of the fresh sample the table is checked on, 0 to skip",
+    )
+    parser.add_argument(
+        "--output", default=None, help="defaults to the table in the package"
+    )
+    args = parser.parse_args(argv)
+
+    table = generate_shift_lookup_table(
+        args.prop_step,
+        args.n_samples,
+        seed=args.seed,
+        n_jobs=args.n_jobs,
+        bins=args.bins or None,
+        lower_range=args.lower_range,
+        upper_range=args.upper_range,
+    )
+    output = lookup_table_path() if args.output is None else args.output
+    save_shift_lookup_table(
+        table,
+        output,
+        seed=args.seed,
+        n_samples=args.n_samples,
+        bins=args.bins,
+        lower_range=args.lower_range,
+        upper_range=args.upper_range,
+    )
+    print(f"Saved shifts for {len(table.props)} props to {output}.")
+
+    if args.check_samples > 0:
+        errors = np.absolute(
+            check_shift_lookup_table(table, args.check_samples, n_jobs=args.n_jobs)
+        )
+        # props that cannot be met within the range end at its bounds
+        within_range = (table.shifts > args.lower_range) & (
+            table.shifts < args.upper_range
+        )
+        print(
+            f"Max error on a fresh sample: {errors[within_range].max():.5f}, "
+            f"{(~within_range).sum()} shifts at the bounds of the range."
+        )
+
+
+if __name__ == "__main__":
+    main()
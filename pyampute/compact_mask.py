@@ -0,0 +1,171 @@
+"""Bit-packed missingness masks"""
+
+from typing import Tuple
+import numpy as np
+from pandas import DataFrame
+
+# Local
+from pyampute.utils import Matrix
+
+# bits (most significant first) of every byte value, to count set bits per column
+BYTE_TO_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1)
+
+
+class CompactMask:
+    """Bit-packed missingness mask of shape `(n, m)`
+
+    Stores one bit instead of one byte per value, in the layout of ``np.packbits(mask, axis=1)``. Reductions such as the missing rate per column and the missing data pattern per row are computed on the packed bytes, without unpacking the whole mask.
+
+    Parameters
+    ----------
+    bits : np.ndarray of shape `(n, ceil(m / 8))`
+        Packed mask, as returned by ``np.packbits(mask, axis=1)``.
+
+    num_columns : int
+        Number of columns `m` of the unpacked mask.
+
+    Attributes
+    ----------
+    bits : np.ndarray of shape `(n, ceil(m / 8))`
+        Packed mask of dtype uint8.
+
+    See also
+    --------
+    :class:`~pyampute.ampute.MultivariateAmputation` : Transformer for generating multivariate missingness in complete datasets
+
+    :class:`~pyampute.exploration.md_patterns.mdPatterns` : Displays missing data patterns in incomplete datasets
+
+    Examples
+    --------
+    >>> import numpy as np
+    >>> from pyampute.compact_mask import CompactMask
+    >>> mask = CompactMask.from_dense(np.array([[True, False], [False, False]]))
+    >>> mask.column_missing_rate()
+    array([0.5, 0. ])
+    """
+
+    def __init__(self, bits: np.ndarray, num_columns: int):
+        bits = np.asarray(bits, dtype=np.uint8)
+        assert bits.ndim == 2, "Packed mask must be 2 dimensional."
+        assert bits.shape[1] == -(-num_columns // 8), (
+            f"Packed mask for {num_columns} columns should have "
+            f"{-(-num_columns // 8)} bytes per row, but has {bits.shape[1]}."
+        )
+        self.bits = bits
+        self.num_columns = num_columns
+
+    @classmethod
+    def from_dense(cls, mask: np.ndarray) -> "CompactMask":
+        """Packs a boolean mask of shape `(n, m)`."""
+        mask = np.asarray(mask, dtype=bool)
+        return cls(np.packbits(mask, axis=1), mask.shape[1])
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.bits.shape[0], self.num_columns)
+
+    def __len__(self) -> int:
+        return self.bits.shape[0]
+
+    def __repr__(self) -> str:
+        return f"CompactMask(shape={self.shape})"
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, CompactMask):
+            return NotImplemented
+        return self.shape == other.shape and np.array_equal(self.bits, other.bits)
+
+    def __or__(self, other: "CompactMask") -> "CompactMask":
+        """Union: values that are missing in either mask."""
+        assert self.shape == other.shape, "Masks must have the same shape."
+        return CompactMask(self.bits | other.bits, self.num_columns)
+
+    def __and__(self, other: "CompactMask") -> "CompactMask":
+        """Intersection: values that are missing in both masks."""
+        assert self.shape == other.shape, "Masks must have the same shape."
+        return CompactMask(self.bits & other.bits, self.num_columns)
+
+    def to_dense(self) -> np.ndarray:
+        """Unpacks into a boolean mask of shape `(n, m)`."""
+        return np.unpackbits(self.bits, axis=1, count=self.num_columns).view(bool)
+
+    def column(self, idx: int) -> np.ndarray:
+        """Boolean mask of a single column, of shape `(n,)`."""
+        byte_idx, bit_idx = divmod(idx, 8)
+        return ((self.bits[:, byte_idx] >> (7 - bit_idx)) & 1).view(bool)
+
+    def column_counts(self) -> np.ndarray:
+        """Number of missing values per column, of shape `(m,)`."""
+        counts = np.concatenate(
+            [
+                np.bincount(self.bits[:, byte_idx], minlength=256) @ BYTE_TO_BITS
+                for byte_idx in range(self.bits.shape[1])
+            ]
+        )
+        return counts[: self.num_columns]
+
+    def column_missing_rate(self) -> np.ndarray:
+        """Proportion of missing values per column, of shape `(m,)`."""
+        return self.column_counts() / max(len(self), 1)
+
+    def pattern_codes(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Missing data pattern per row.
+
+        Returns
+        -------
+        codes : np.ndarray of shape `(n,)`
+            Index into `patterns` of the pattern of every row.
+
+        patterns : np.ndarray of shape `(p, m)`
+            The `p` unique missing data patterns as boolean masks.
+        """
+        num_bytes = self.bits.shape[1]
+        if num_bytes <= 8:
+            # read the bytes of each row as one big-endian integer
+            padded = np.zeros((len(self), 8), dtype=np.uint8)
+            padded[:, :num_bytes] = self.bits
+            keys = padded.view(">u8")[:, 0]
+            unique_keys, codes = np.unique(keys, return_inverse=True)
+            unique_bits = (
+                unique_keys.astype(">u8")[:, None].view(np.uint8)[:, :num_bytes]
+            )
+        else:
+            rows = np.ascontiguousarray(self.bits).view(
+                np.dtype((np.void, num_bytes))
+            )[:, 0]
+            unique_rows, codes = np.unique(rows, return_inverse=True)
+            unique_bits = unique_rows.view(np.uint8).reshape(-1, num_bytes)
+        patterns = np.unpackbits(unique_bits, axis=1, count=self.num_columns)
+        return codes.ravel(), patterns.view(bool)
+
+    def pattern_counts(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Unique missing data patterns, of shape `(p, m)`, and the number of
+        rows that follow each of them, of shape `(p,)`.
+        """
+        codes, patterns = self.pattern_codes()
+        return patterns, np.bincount(codes, minlength=len(patterns))
+
+    def apply(self, X: Matrix, copy: bool = True, block_size: int = 65536) -> Matrix:
+        """
+        Sets the masked values of X to NaN.
+
+        Arrays are processed in blocks of rows, so at most ``block_size`` rows
+        of the mask are unpacked at a time. If not ``copy``, X is modified in
+        place and must be of float dtype.
+        """
+        assert X.shape == self.shape, "Mask and data must have the same shape."
+        if isinstance(X, DataFrame):
+            if copy:
+                return X.mask(self.to_dense())
+            X.mask(self.to_dense(), inplace=True)
+            return X
+        X_incomplete = X.astype(float) if copy else X
+        for start in range(0, len(self), block_size):
+            stop = start + block_size
+            dense_block = np.unpackbits(
+                self.bits[start:stop], axis=1, count=self.num_columns
+            ).view(bool)
+            np.putmask(X_incomplete[start:stop], dense_block, np.nan)
+        return X_incomplete
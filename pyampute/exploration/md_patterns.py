@@ -2,12 +2,14 @@
 # Author: Rianne Schouten <https://rianneschouten.github.io/>
 # Co-Author: Srinidhi Ilango
 
+from typing import Union
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 from matplotlib import colors
 
 # Local
+from pyampute.compact_mask import CompactMask
 from pyampute.utils import Matrix
 
 
@@ -61,14 +63,18 @@ class mdPatterns:
         self.md_patterns = None
 
     def get_patterns(
-        self, X: Matrix, count_or_proportion: str = "count", show_plot: bool = True
+        self,
+        X: Union[Matrix, CompactMask],
+        count_or_proportion: str = "count",
+        show_plot: bool = True,
     ) -> pd.DataFrame:
         """Extracts and visualizes missing data patterns in an incomplete dataset
 
         Parameters
         ----------
-        X : Matrix of shape `(n, m)`
+        X : Union[Matrix, CompactMask] of shape `(n, m)`
             Dataset with missing values. `n` rows (samples) and `m` columns (features).
+            Alternatively, the missingness mask of a dataset as a :class:`~pyampute.compact_mask.CompactMask`, which is summarized without unpacking it.
         
         count_or_proportion : str, {"count", "proportion"}, default : "count"
             Whether the number of rows should be specified as a count or a proportion. 
@@ -86,10 +92,11 @@ class mdPatterns:
         """
 
         # make sure X is a pd.DataFrame
-        Xdf = pd.DataFrame(X)
+        if not isinstance(X, CompactMask):
+            X = pd.DataFrame(X)
 
         # calculate patterns
-        self._calculate_patterns(Xdf, count_or_proportion)
+        self._calculate_patterns(X, count_or_proportion)
 
         # make plot
         if show_plot:
@@ -98,21 +105,39 @@ class mdPatterns:
         return self.md_patterns
 
     def _calculate_patterns(
-        self, X: pd.DataFrame, count_or_proportion: str = "count"
+        self, X: Union[pd.DataFrame, CompactMask], count_or_proportion: str = "count"
     ) -> pd.DataFrame:
         """Extracts all unique missing data patterns in an incomplete dataset and transforms into a pandas DataFrame"""
 
-        # mask
-        mask = X.isnull()
-
-        # count number of missing values per column
-        colsums = mask.sum()
+        if isinstance(X, CompactMask):
+            # count number of missing values per column
+            colsums = pd.Series(X.column_counts())
+            # unique patterns with their number of rows
+            patterns, row_counts = X.pattern_counts()
+            observed = pd.DataFrame(~patterns)
+        else:
+            # mask
+            mask = X.isnull()
+
+            # count number of missing values per column
+            colsums = mask.sum()
+            observed = ~mask
         sorted_col = colsums.sort_values().index.tolist()
         colsums["n_missing_values"] = colsums.sum()
         colsums["row_count"] = ""
 
         # finding missing values per group
-        group_values = (~mask).groupby(sorted_col).size().reset_index(name="row_count")
+        if isinstance(X, CompactMask):
+            group_values = (
+                pd.Series(row_counts)
+                .groupby([observed[col] for col in sorted_col])
+                .sum()
+                .reset_index(name="row_count")
+            )
+        else:
+            group_values = (
+                observed.groupby(sorted_col).size().reset_index(name="row_count")
+            )
         group_values["n_missing_values"] = group_values.isin([0]).sum(axis=1)
         group_values.sort_values(
             by=["n_missing_values", "row_count"], ascending=[True, False], inplace=True
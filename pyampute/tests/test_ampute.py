@@ -1,8 +1,15 @@
 import numpy as np
+import os
+import pandas as pd
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from scipy import stats
 
 from pyampute.ampute import MultivariateAmputation
 from pyampute.exploration.md_patterns import mdPatterns
+from pyampute.compact_mask import CompactMask
 
 
 # test that all mechanisms work
@@ -189,15 +196,636 @@ class TestAmpute(unittest.TestCase):
                 {'incomplete_vars': [1], 'weights': {0:1,1:2}, 'mechanism': "MAR+MNAR"}
             ]
         )
-        X_amputed = ma.fit_transform(X)
+        X_amputed, diagnostics = ma.fit(X).transform(X, return_diagnostics=True)
 
-        self.assertTrue(len(ma.wss_per_pattern), 3)
-        self.assertTrue(len(ma.probs_per_pattern), 3)
+        self.assertTrue(len(diagnostics.wss_per_pattern), 3)
+        self.assertTrue(len(diagnostics.probs_per_pattern), 3)
         self.assertListEqual(ma.mechanisms.tolist(), ["MCAR", "MNAR", "MAR+MNAR"])
-        self.assertEqual(len(ma.wss_per_pattern[0]), len(ma.probs_per_pattern[0]))
-        self.assertEqual(len(ma.assigned_group_number), X.shape[0])
-        self.assertEqual(len(ma.assigned_group_number[ma.assigned_group_number == 1]), len(ma.wss_per_pattern[1]))
-        self.assertEqual(len(ma.assigned_group_number[ma.assigned_group_number == 2]), len(ma.probs_per_pattern[2]))
+        self.assertEqual(len(diagnostics.wss_per_pattern[0]), len(diagnostics.probs_per_pattern[0]))
+        self.assertEqual(len(diagnostics.assigned_group_number), X.shape[0])
+        self.assertEqual(len(diagnostics.assigned_group_number[diagnostics.assigned_group_number == 1]), len(diagnostics.wss_per_pattern[1]))
+        self.assertEqual(len(diagnostics.assigned_group_number[diagnostics.assigned_group_number == 2]), len(diagnostics.probs_per_pattern[2]))
+
+        # transform leaves the amputer untouched
+        self.assertFalse(hasattr(ma, "wss_per_pattern"))
+
+    def test_concurrent_transforms(self):
+        X = np.random.randn(5000, 3)
+        ma = MultivariateAmputation(
+            patterns=[
+                {"incomplete_vars": [0], "mechanism": "MAR"},
+                {"incomplete_vars": [1, 2], "mechanism": "MNAR"},
+            ],
+            seed=2022,
+        ).fit(X)
+        datasets = [X * scale for scale in range(1, 9)]
+        expected = [ma.transform(data) for data in datasets]
+        # a single fitted amputer serves all threads
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(ma.transform, datasets))
+        for result, X_incomplete in zip(results, expected):
+            self.assertTrue(np.array_equal(result, X_incomplete, equal_nan=True))
+
+    def test_global_random_state(self):
+        X = np.random.randn(1000, 3)
+        state = np.random.get_state()
+        ma = MultivariateAmputation(seed=4)
+        X_incomplete = ma.fit_transform(X)
+        ma.sample_masks(X, 2)
+        # amputation draws from its own streams only
+        self.assertTrue(np.array_equal(np.random.get_state()[1], state[1]))
+        np.random.seed(0)
+        self.assertTrue(
+            np.array_equal(ma.fit_transform(X), X_incomplete, equal_nan=True)
+        )
+
+    def test_single_pass_matches_per_pattern(self):
+        n = 10000
+        X = np.random.randn(n, 4)
+        ma = MultivariateAmputation(
+            patterns=[
+                {"incomplete_vars": [0], "mechanism": "MAR"},
+                {"incomplete_vars": [1, 2], "mechanism": "MNAR"},
+                {"incomplete_vars": [3], "mechanism": "MCAR"},
+                {
+                    "incomplete_vars": [2],
+                    "mechanism": "MAR",
+                    "score_to_probability_func": "sigmoid-tail",
+                },
+            ],
+            prop=0.3,
+            seed=2022,
+        )
+        X_amputed, diagnostics = ma.fit(X).transform(X, return_diagnostics=True)
+
+        for pattern_idx in range(ma.num_patterns):
+            # scores and probabilities within the pattern subset,
+            # data standardized with the statistics from fit
+            in_group = diagnostics.assigned_group_number == pattern_idx
+            data_group = stats.zscore(X)[in_group]
+            wss = np.dot(data_group, ma.weights[pattern_idx])
+            self.assertTrue(np.allclose(diagnostics.wss_per_pattern[pattern_idx], wss))
+
+            func = ma.score_to_probability_func[pattern_idx]
+            if ma.mechanisms[pattern_idx] == "MCAR":
+                probs = np.repeat(ma.prop, in_group.sum())
+            else:
+                shift = ma._calculate_shift(
+                    stats.zscore(wss), func, ma.prop, -3, 3, 100, 0.001
+                )
+                probs = ma._shifted_probability_func(stats.zscore(wss), shift, func)
+            self.assertTrue(
+                np.allclose(diagnostics.probs_per_pattern[pattern_idx], probs)
+            )
+
+            # only the pattern's incomplete vars are amputed
+            amputed_rows = np.isnan(X_amputed[in_group]).any(axis=1)
+            self.assertTrue(
+                np.array_equal(
+                    np.isnan(X_amputed[in_group][amputed_rows]).any(axis=0),
+                    ~ma.observed_var_indicator[pattern_idx],
+                )
+            )
+            self.assertAlmostEqual(amputed_rows.mean(), 0.3, delta=0.05)
+
+    def test_transform_mask(self):
+        n = 1000
+        X = np.random.randn(n, 10)
+        X_orig = X.copy()
+        ma = MultivariateAmputation(
+            patterns=[
+                {"incomplete_vars": [0, 9], "mechanism": "MAR"},
+                {"incomplete_vars": [3], "mechanism": "MNAR"},
+            ],
+            seed=2022,
+        ).fit(X)
+
+        mask = ma.transform_mask(X)
+        self.assertEqual(mask.dtype, bool)
+        self.assertTrue(np.array_equal(mask, np.isnan(ma.transform(X))))
+        # data is left untouched
+        self.assertTrue(np.array_equal(X, X_orig))
+
+        packed = ma.transform_mask(X, packed=True)
+        self.assertEqual(packed.shape, (n, 10))
+        self.assertEqual(packed.bits.shape, (n, 2))
+        self.assertTrue(np.array_equal(packed.bits, np.packbits(mask, axis=1)))
+
+    def test_copy(self):
+        n = 1000
+        patterns = [{"incomplete_vars": [0, 1], "mechanism": "MAR"}]
+        with self.subTest("Numpy"):
+            X = np.random.randn(n, 4)
+            X_orig = X.copy()
+            X_amputed = MultivariateAmputation(patterns=patterns, seed=4).fit_transform(
+                X
+            )
+            self.assertTrue(np.array_equal(X, X_orig))
+
+            X_inplace = MultivariateAmputation(
+                patterns=patterns, seed=4, copy=False
+            ).fit_transform(X)
+            self.assertIs(X_inplace, X)
+            self.assertTrue(np.array_equal(X, X_amputed, equal_nan=True))
+
+            with self.assertRaises(AssertionError):
+                MultivariateAmputation(patterns=patterns, copy=False).fit_transform(
+                    np.random.randint(0, 100, size=(n, 4))
+                )
+
+        with self.subTest("Pandas"):
+            X = pd.DataFrame(np.random.randn(n, 4), columns=["a", "b", "c", "d"])
+            X["d"] = np.arange(n)  # not amputed, so may have any dtype
+            ma = MultivariateAmputation(patterns=patterns, seed=4, copy=False)
+            X_inplace = ma.fit_transform(X)
+            self.assertIs(X_inplace, X)
+            self.assertTrue(X[["a", "b"]].isnull().any().all())
+            self.assertFalse(X[["c", "d"]].isnull().any().any())
+            self.assertEqual(X["d"].dtype, int)
+
+            X["a"] = np.arange(n)
+            with self.assertRaises(AssertionError):
+                ma.transform(X)
+
+    def test_sample_masks(self):
+        n = 2000
+        n_replicates = 200
+        X = np.random.randn(n, 10)
+        ma = MultivariateAmputation(
+            patterns=[
+                {"incomplete_vars": [0, 1], "mechanism": "MAR", "freq": 0.3},
+                {"incomplete_vars": [2], "mechanism": "MNAR", "freq": 0.2},
+                {"incomplete_vars": [9], "mechanism": "MCAR", "freq": 0.5},
+            ],
+            prop=0.3,
+            seed=2022,
+        ).fit(X)
+
+        masks = ma.sample_masks(X, n_replicates)
+        self.assertEqual(masks.shape, (n_replicates, n, 2))
+        dense = np.unpackbits(masks, axis=2, count=10).astype(bool)
+        # prop * freq missing per column, averaged over replicates
+        self.assertTrue(
+            np.allclose(
+                dense.mean(axis=(0, 1)),
+                [0.09, 0.09, 0.06, 0, 0, 0, 0, 0, 0, 0.15],
+                atol=0.01,
+            )
+        )
+        # replicates differ from each other
+        self.assertFalse(np.array_equal(masks[0], masks[1]))
+        # seeded
+        self.assertTrue(np.array_equal(masks, ma.sample_masks(X, n_replicates)))
+
+        generated = list(ma.sample_masks(X, 3, as_generator=True))
+        self.assertEqual(len(generated), 3)
+        for mask, packed in zip(generated, masks):
+            self.assertEqual(mask, CompactMask(packed, 10))
+
+    def test_fit_standardization(self):
+        X = np.random.randn(10000, 3) * [1, 10, 100] + [0, 5, -5]
+        ma = MultivariateAmputation(
+            patterns=[{"incomplete_vars": [0], "mechanism": "MAR"}]
+        ).fit(X)
+        self.assertTrue(np.isnan(ma.column_means[0]))
+        self.assertTrue(np.allclose(ma.column_means[1:], X[:, 1:].mean(axis=0)))
+        self.assertTrue(np.allclose(ma.column_stds[1:], X[:, 1:].std(axis=0)))
+
+        # scores of a row do not depend on the other rows transformed with it
+        wss = ma.transform(X, return_diagnostics=True)[1].wss_per_pattern[0]
+        diagnostics = ma.transform(X[:100], return_diagnostics=True)[1]
+        self.assertTrue(np.allclose(diagnostics.wss_per_pattern[0], wss[:100]))
+
+    def test_chunked(self):
+        X = np.random.randn(20000, 3) * [1, 10, 100] + [0, 5, -5]
+        chunks = np.array_split(X, 7)
+        patterns = [
+            {"incomplete_vars": [0], "mechanism": "MAR"},
+            {"incomplete_vars": [1], "score_to_probability_func": "sigmoid-mid"},
+        ]
+        ma = MultivariateAmputation(
+            prop=0.4, patterns=patterns, seed=2022, sketch_size=5000
+        ).fit_chunked(iter(chunks))
+        self.assertTrue(np.allclose(ma.column_means[1:], X[:, 1:].mean(axis=0)))
+        self.assertTrue(np.allclose(ma.column_stds[1:], X[:, 1:].std(axis=0)))
+
+        incomplete_chunks = list(ma.transform_chunked(chunks))
+        self.assertEqual(
+            [len(chunk) for chunk in incomplete_chunks], [len(chunk) for chunk in chunks]
+        )
+        X_incomplete = np.concatenate(incomplete_chunks)
+        self.assertAlmostEqual(
+            np.isnan(X_incomplete).any(axis=1).mean(), 0.4, delta=0.02
+        )
+        # chunks are not amputed with the same draws
+        self.assertFalse(
+            np.array_equal(
+                np.isnan(incomplete_chunks[0][:100]),
+                np.isnan(incomplete_chunks[1][:100]),
+            )
+        )
+
+        # fit resets the reference, transform_chunked then refuses
+        ma.fit(X)
+        self.assertIsNone(ma.reference_calibration)
+        with self.assertRaises(AssertionError):
+            next(ma.transform_chunked(chunks))
+
+    def test_partial_fit(self):
+        X = np.random.randn(20000, 3) * [1, 10, 100] + [0, 5, -5]
+        ma = MultivariateAmputation(
+            prop=0.4,
+            patterns=[{"incomplete_vars": [0], "mechanism": "MAR"}],
+            seed=2022,
+        )
+        for batch in np.array_split(X[:10000], 10):
+            ma.partial_fit(batch)
+        self.assertTrue(np.allclose(ma.column_means[1:], X[:10000, 1:].mean(axis=0)))
+        self.assertTrue(np.allclose(ma.column_stds[1:], X[:10000, 1:].std(axis=0)))
+
+        # small batches are amputed with the calibration on all data seen so far
+        X_incomplete = np.concatenate(
+            [ma.transform(batch) for batch in np.array_split(X[10000:], 200)]
+        )
+        self.assertAlmostEqual(
+            np.isnan(X_incomplete).any(axis=1).mean(), 0.4, delta=0.02
+        )
+        reference = ma.reference_calibration
+        ma.transform(X[:10])
+        self.assertIs(ma.reference_calibration, reference)
+        ma.partial_fit(X[10000:])
+        ma.transform(X[:10])
+        self.assertIsNot(ma.reference_calibration, reference)
+        self.assertTrue(np.allclose(ma.column_means[1:], X[:, 1:].mean(axis=0)))
+
+        # a small batch only updates the standardization of the wss, which
+        # matches a full calibration on the sample
+        reference = ma.reference_calibration
+        ma.partial_fit(X[:10])
+        ma.transform(X[:10])
+        self.assertIs(ma.reference_calibration.shifts, reference.shifts)
+        full = ma._calibrate(*ma._sumscores_per_pattern(ma._sketch.sample))
+        self.assertTrue(np.allclose(ma.reference_calibration.wss_means, full.wss_means))
+        self.assertTrue(np.allclose(ma.reference_calibration.wss_stds, full.wss_stds))
+
+        # a recalibration is spread over the batches that follow
+        for _ in range(1000):
+            ma.partial_fit(X[:10])
+            if ma._pending_calibration is not None:
+                break
+        self.assertIsNotNone(ma._pending_calibration)
+        reference = ma.reference_calibration
+        ma.partial_fit(X[:10])
+        self.assertIs(ma.reference_calibration.shifts, reference.shifts)
+        while ma._pending_calibration is not None:
+            ma.partial_fit(X[:10])
+        self.assertIsNot(ma.reference_calibration.shifts, reference.shifts)
+
+        # transform leaves the amputer as it is, yet batches get their own draws
+        state = dict(vars(ma))
+        spawned = ma._stream_seed_sequence.n_children_spawned
+        masks = [np.isnan(ma.transform(X[i : i + 1000])) for i in (0, 1000, 0)]
+        self.assertEqual(ma._stream_seed_sequence.n_children_spawned, spawned)
+        self.assertEqual(state.keys(), vars(ma).keys())
+        for name, value in state.items():
+            self.assertIs(getattr(ma, name), value)
+        self.assertFalse(np.array_equal(masks[0], masks[1]))
+        self.assertTrue(np.array_equal(masks[0], masks[2]))
+
+    def test_n_jobs(self):
+        # more rows than one block, so blocks are spread over threads
+        X = np.random.randn(150000, 4)
+        patterns = [
+            {"incomplete_vars": [0], "mechanism": "MAR"},
+            {"incomplete_vars": [1, 2], "score_to_probability_func": "sigmoid-tail"},
+            {"incomplete_vars": [3], "mechanism": "MNAR"},
+        ]
+        X_incomplete = MultivariateAmputation(
+            patterns=patterns, seed=2022
+        ).fit_transform(X)
+        for n_jobs in [2, -1]:
+            ma = MultivariateAmputation(patterns=patterns, seed=2022, n_jobs=n_jobs)
+            self.assertTrue(
+                np.array_equal(ma.fit_transform(X), X_incomplete, equal_nan=True)
+            )
+            self.assertTrue(
+                ma.fit_transform(pd.DataFrame(X)).equals(pd.DataFrame(X_incomplete))
+            )
+
+    def test_dtype(self):
+        X = np.random.randn(50000, 3).astype(np.float32)
+        patterns = [
+            {"incomplete_vars": [0], "score_to_probability_func": func}
+            for func in ["sigmoid-right", "sigmoid-left", "sigmoid-mid", "sigmoid-tail"]
+        ]
+        for dtype in [np.float32, None]:
+            ma = MultivariateAmputation(
+                patterns=patterns, prop=0.3, seed=2022, dtype=dtype
+            ).fit(X)
+            # calibrate with the binary search rather than the lookup table
+            ma.shift_lookup_table = None
+            X_incomplete, diagnostics = ma.transform(X, return_diagnostics=True)
+            self.assertEqual(X_incomplete.dtype, np.float32)
+            for wss, probs in zip(
+                diagnostics.wss_per_pattern, diagnostics.probs_per_pattern
+            ):
+                self.assertEqual(wss.dtype, np.float32)
+                self.assertEqual(probs.dtype, np.float32)
+                self.assertLess(
+                    abs(probs.mean(dtype=np.float64) - 0.3), ma.max_diff_with_target
+                )
+
+        # other dtypes are computed in float64, unless specified otherwise
+        X_int = pd.DataFrame(X.astype(int))
+        ma = MultivariateAmputation(patterns=patterns, dtype=None).fit(X_int)
+        _, diagnostics = ma.transform(X_int, return_diagnostics=True)
+        self.assertEqual(diagnostics.probs_per_pattern[0].dtype, np.float64)
+        with self.assertRaises(AssertionError):
+            MultivariateAmputation(patterns=patterns, dtype=int).fit(X)
+
+        # without involved vars (only MCAR) there is no dtype to keep
+        X_frame = pd.DataFrame(X)
+        X_incomplete = MultivariateAmputation(
+            patterns=[{"incomplete_vars": [0, 1], "mechanism": "MCAR"}],
+            prop=0.3,
+            seed=2022,
+            dtype=None,
+        ).fit_transform(X_frame)
+        self.assertAlmostEqual(
+            X_incomplete.isnull().any(axis=1).mean(), 0.3, delta=0.02
+        )
+
+    def test_exact_assignment(self):
+        X = np.random.randn(1001, 3)
+        patterns = [
+            {"incomplete_vars": [0], "freq": 0.5},
+            {"incomplete_vars": [1], "freq": 0.3, "mechanism": "MNAR"},
+            {"incomplete_vars": [2], "freq": 0.2},
+        ]
+        for seed in [2022, 2023]:
+            ma = MultivariateAmputation(
+                patterns=patterns, seed=seed, assignment="exact"
+            )
+            _, diagnostics = ma.fit(X).transform(X, return_diagnostics=True)
+            self.assertListEqual(
+                np.bincount(diagnostics.assigned_group_number).tolist(), [501, 300, 200]
+            )
+            # scores per pattern are still in row order
+            groups = diagnostics.assigned_group_number
+            all_wss = ma._calculate_sumscores(X, groups)
+            for pattern_idx, wss in enumerate(diagnostics.wss_per_pattern):
+                self.assertTrue(np.array_equal(wss, all_wss[groups == pattern_idx]))
+
+        masks = ma.sample_masks(X, 3)
+        for mask in masks:
+            patterns_used = np.unpackbits(mask, axis=1)[:, :3]
+            # rows of the same pattern are amputed with the same vars
+            self.assertLessEqual(patterns_used.sum(axis=1).max(), 1)
+        with self.assertRaises(AssertionError):
+            MultivariateAmputation(assignment="fixed").fit(X)
+
+    def test_exact_selection(self):
+        X = np.random.randn(1001, 3)
+        patterns = [
+            {"incomplete_vars": [0], "freq": 0.5},
+            {"incomplete_vars": [1], "freq": 0.5, "mechanism": "MCAR"},
+        ]
+        ma = MultivariateAmputation(
+            patterns=patterns, prop=0.3, seed=2022, selection="exact"
+        ).fit(X)
+        # no shift is searched for
+        ma.shift_lookup_table = None
+        groups, chosen, _ = ma._choose_candidates(X)
+        for pattern_idx in range(2):
+            rows = groups == pattern_idx
+            self.assertEqual(chosen[rows].sum(), round(0.3 * rows.sum()))
+        # rows with a high score are amputed more often under sigmoid-right
+        wss = ma._calculate_sumscores(X, groups)[groups == 0]
+        amputed = chosen[groups == 0]
+        self.assertGreater(wss[amputed].mean(), wss[~amputed].mean())
+
+        for seed in [1, 2, 3]:
+            ma = MultivariateAmputation(
+                patterns=patterns,
+                prop=0.3,
+                seed=seed,
+                assignment="exact",
+                selection="exact",
+            )
+            X_incomplete = ma.fit_transform(X)
+            self.assertEqual(np.isnan(X_incomplete).any(axis=1).sum(), 150 + 150)
+            masks = ma.sample_masks(X, 3)
+            self.assertListEqual(
+                (masks.any(axis=2).sum(axis=1)).tolist(), [300, 300, 300]
+            )
+
+    def test_calibration_bins(self):
+        X = np.random.randn(100000, 3)
+        patterns = [
+            {"incomplete_vars": [0], "score_to_probability_func": func}
+            for func in ["sigmoid-right", "sigmoid-tail"]
+        ]
+        ma = MultivariateAmputation(
+            patterns=patterns, prop=0.3, seed=2022, calibration_bins=128
+        ).fit(X)
+        ma.shift_lookup_table = None
+        with self.assertLogs(level="INFO") as logs:
+            _, diagnostics = ma.transform(X, return_diagnostics=True)
+        self.assertTrue(any("Calibration error" in line for line in logs.output))
+        for probs in diagnostics.probs_per_pattern:
+            self.assertLess(abs(probs.mean() - 0.3), ma.max_diff_with_target)
+
+    def test_calibrate_custom(self):
+        X = np.random.randn(20000, 3)
+        patterns = [
+            {
+                "incomplete_vars": [0],
+                "score_to_probability_func": lambda X: 0.2 * (X > 0) + 0.1,
+            }
+        ]
+        with tempfile.TemporaryDirectory() as directory, mock.patch.dict(
+            os.environ, {"PYAMPUTE_CACHE_DIR": directory}
+        ):
+            for use_table in [True, False]:
+                ma = MultivariateAmputation(
+                    patterns=patterns, prop=0.4, seed=2022, calibrate_custom=True
+                ).fit(X)
+                if not use_table:
+                    ma.shift_lookup_table = None
+                _, diagnostics = ma.transform(X, return_diagnostics=True)
+                probs = diagnostics.probs_per_pattern[0]
+                self.assertAlmostEqual(probs.mean(), 0.4, delta=0.01)
+                # the function is shifted, but keeps its shape
+                wss = diagnostics.wss_per_pattern[0]
+                self.assertGreater(probs[wss > 0].min(), probs[wss < 0].max())
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+        # not calibrated by default
+        _, diagnostics = (
+            MultivariateAmputation(patterns=patterns, prop=0.4)
+            .fit(X)
+            .transform(X, return_diagnostics=True)
+        )
+        self.assertAlmostEqual(diagnostics.probs_per_pattern[0].mean(), 0.2, delta=0.02)
+
+        # the binary search shifts custom functions on the logit scale too
+        func = patterns[0]["score_to_probability_func"]
+        wss = np.random.randn(20000)
+        shift, probs = MultivariateAmputation._binary_search(
+            wss, func, 0.4, -3, 3, 100, 0.001
+        )
+        self.assertAlmostEqual(probs.mean(), 0.4, delta=0.001)
+        self.assertTrue(
+            np.allclose(
+                probs, MultivariateAmputation._shifted_probability_func(wss, shift, func)
+            )
+        )
+        unshifted = MultivariateAmputation._shifted_probability_func(wss, 0, func)
+        self.assertTrue(np.allclose(unshifted, func(wss)))
+
+    def test_calibration_modes(self):
+        # skewed and binary-heavy scores, for which the lookup table is off
+        rng = np.random.default_rng(2022)
+        n = 100000
+        X = np.column_stack(
+            [
+                rng.exponential(size=n),
+                rng.binomial(1, 0.1, size=n) + rng.normal(0, 0.01, size=n),
+                rng.normal(size=n),
+            ]
+        )
+        patterns = [
+            {"incomplete_vars": [2], "weights": {0: 1}},
+            {"incomplete_vars": [2], "weights": {1: 1}},
+        ]
+        mean_probs = {}
+        for calibration in ["lookup", "search", "hybrid"]:
+            ma = MultivariateAmputation(
+                patterns=patterns, prop=0.3, seed=2022, calibration=calibration
+            ).fit(X)
+            self.assertEqual(ma.shift_lookup_table is None, calibration == "search")
+            _, diagnostics = ma.transform(X, return_diagnostics=True)
+            mean_probs[calibration] = np.array(
+                [probs.mean() for probs in diagnostics.probs_per_pattern]
+            )
+        self.assertGreater(np.absolute(mean_probs["lookup"] - 0.3).max(), 0.01)
+        for calibration in ["search", "hybrid"]:
+            self.assertLess(
+                np.absolute(mean_probs[calibration] - 0.3).max(),
+                ma.max_diff_with_target,
+            )
+        with self.assertRaises(AssertionError):
+            MultivariateAmputation(calibration="table").fit(X)
+
+        # if the table cannot be read, the shifts are searched for instead
+        with mock.patch(
+            "pyampute.ampute.load_shift_lookup_table", side_effect=OSError
+        ), self.assertLogs(level="WARNING"):
+            ma = MultivariateAmputation(patterns=patterns, prop=0.3).fit(X)
+        self.assertIsNone(ma.shift_lookup_table)
+        amputed_rows = np.isnan(ma.transform(X)).any(axis=1)
+        self.assertAlmostEqual(amputed_rows.mean(), 0.3, delta=0.01)
+
+    def test_validation_profile(self):
+        X = np.random.randn(1000, 3)
+        ma = MultivariateAmputation(seed=2022).fit(X)
+        validate = ma._validate_data_with_counts
+        # the fitted data is recognized and reuses the counts from fit
+        self.assertIs(validate(X)[1], ma._data_profile.distinct_counts)
+        self.assertNotEqual(ma._fingerprint(X * 2), ma._data_profile.fingerprint)
+        self.assertIsNone(validate(X, validate=False)[1])
+
+        # skipping validation does not change the amputation
+        X_other = np.random.randn(1000, 3)
+        X_validated = MultivariateAmputation(seed=2022).fit(X).transform(X_other)
+        ma = MultivariateAmputation(seed=2022).fit(X)
+        X_trusted = ma.transform(X_other, validate=False)
+        self.assertTrue(np.array_equal(np.isnan(X_trusted), np.isnan(X_validated)))
+
+        # missing values are rejected even if the fingerprint still matches
+        ma = MultivariateAmputation(
+            patterns=[{"incomplete_vars": [0], "mechanism": "MAR"}], seed=2022
+        ).fit(X)
+        X[5, 1] = np.nan
+        self.assertEqual(ma._fingerprint(X), ma._data_profile.fingerprint)
+        for validate_data in [True, False]:
+            with self.assertRaises(AssertionError):
+                ma.transform(X, validate=validate_data)
+
+    def test_calibrate_props(self):
+        rng = np.random.default_rng(2022)
+        X = np.column_stack([rng.exponential(size=20000), rng.normal(size=(20000, 2))])
+        patterns = [
+            {"incomplete_vars": [2], "weights": {0: 1}},
+            {
+                "incomplete_vars": [2],
+                "weights": {1: 1},
+                "score_to_probability_func": "sigmoid-tail",
+            },
+            {"incomplete_vars": [0], "mechanism": "MCAR"},
+        ]
+        props = [0.1, 0.3, 0.5, 0.7]
+
+        # the sweep gives the same masks as calibrating every prop on its own
+        ma = MultivariateAmputation(patterns=patterns, seed=2022).fit(X)
+        self.assertEqual(ma.score_to_probability_func[1], "SIGMOID-TAIL")
+        shifts = ma.calibrate_props(X, props)
+        self.assertEqual(shifts.shape, (len(props), 3))
+        self.assertTrue((shifts[:, 2] == 0).all())
+        for prop in props:
+            ma.prop = prop
+            with mock.patch.object(
+                ma, "_sumscores_per_pattern", side_effect=AssertionError
+            ):
+                masks = ma.sample_masks(X, 2)
+            reference = MultivariateAmputation(
+                patterns=patterns, prop=prop, seed=2022
+            ).fit(X)
+            self.assertTrue(np.array_equal(masks, reference.sample_masks(X, 2)))
+
+        # transform reuses the scores and calibration over all rows as well
+        with mock.patch.object(
+            ma, "_calculate_sumscores", side_effect=AssertionError
+        ):
+            _, diagnostics = ma.transform(X, return_diagnostics=True)
+        probs = ma._probabilities_per_pattern(X)
+        groups = diagnostics.assigned_group_number
+        for pattern_idx, pattern_probs in enumerate(diagnostics.probs_per_pattern):
+            self.assertTrue(
+                np.allclose(pattern_probs, probs[pattern_idx, groups == pattern_idx])
+            )
+
+        # solved shifts meet the props on the data
+        ma = MultivariateAmputation(
+            patterns=patterns, seed=2022, calibration="search"
+        ).fit(X)
+        ma.calibrate_props(X, props)
+        for prop in props:
+            ma.prop = prop
+            probs = ma._probabilities_per_pattern(X)
+            self.assertLess(
+                np.absolute(probs.mean(axis=1) - prop).max(), ma.max_diff_with_target
+            )
+
+        # other data, props and refits are calibrated anew
+        ma.prop = 0.4
+        self.assertIsNone(ma._prop_sweep_index(X))
+        ma.prop = 0.3
+        self.assertIsNone(ma._prop_sweep_index(X * 2))
+        # also if a row outside the sample of the cheap fingerprint changed
+        value = X[5, 1]
+        X[5, 1] = value + 1
+        self.assertEqual(ma._fingerprint(X), ma._data_profile.fingerprint)
+        self.assertIsNone(ma._prop_sweep_index(X))
+        X[5, 1] = value
+        self.assertIsNotNone(ma._prop_sweep_index(X))
+        X[5, 1] = np.nan
+        with self.assertRaises(AssertionError):
+            ma.sample_masks(X, 1)
+        X[5, 1] = value
+        self.assertIsNone(ma.fit(X).prop_sweep)
+        with self.assertRaises(AssertionError):
+            ma.calibrate_props(X, [0.5, 1.5])
 
     def test_sigmoid_score_to_prob_function(self):
         # create complete data
@@ -222,7 +850,7 @@ class TestAmpute(unittest.TestCase):
 
             # run ampute
             ma = MultivariateAmputation(prop=my_prop, patterns=patterns)
-            X_amputed = ma.fit_transform(X)
+            X_amputed, diagnostics = ma.fit(X).transform(X, return_diagnostics=True)
 
             mdp = mdPatterns()
             patterns = mdp.get_patterns(X_amputed, show_plot=False)
@@ -245,8 +873,8 @@ class TestAmpute(unittest.TestCase):
                     atol=0.05 * n,
                 )
             )
-            probs = ma.probs_per_pattern[0]
-            wss = ma.wss_per_pattern[0]
+            probs = diagnostics.probs_per_pattern[0]
+            wss = diagnostics.wss_per_pattern[0]
             if score_to_prob_function == "sigmoid-right":
                 self.assertGreater(
                     probs[np.argmax(wss)], probs[np.argmin(wss)],
@@ -2,7 +2,15 @@ import numpy as np
 import pandas as pd
 import unittest
 
-from pyampute.utils import enforce_numeric
+from pyampute.utils import (
+    enforce_numeric,
+    coerce_numeric,
+    numeric_coercion_plan,
+    count_distinct,
+    exact_group_counts,
+    permutation_segments,
+    weighted_choice_exact,
+)
 
 
 class TestEnforceNumeric(unittest.TestCase):
@@ -57,6 +65,76 @@ class TestEnforceNumeric(unittest.TestCase):
         self.assertTrue(numeric_strname.equals(numeric_idx))
         self.assertTrue(numeric_strname.equals(correct))
 
+    def test_coerce_numeric(self):
+        correct = np.array(self.numeric, dtype=float)
+        for data in [np.array(self.array, dtype=object), pd.DataFrame(self.array)]:
+            numeric = coerce_numeric(data)
+            self.assertEqual(numeric.dtype, np.float64)
+            self.assertTrue(np.array_equal(numeric, correct))
+
+        # only the planned columns are parsed
+        df = pd.DataFrame(self.array)
+        plan = numeric_coercion_plan(df.dtypes)
+        numeric = coerce_numeric(df, plan, np.float32)
+        self.assertTrue(np.array_equal(numeric, correct.astype(np.float32)))
+
+        # numeric data of the requested dtype is not copied
+        array = np.array(self.numeric, dtype=float)
+        self.assertTrue(np.shares_memory(coerce_numeric(array), array))
+        self.assertTrue(np.shares_memory(coerce_numeric(array[:, 1:3]), array))
+
+
+class TestCountDistinct(unittest.TestCase):
+    def test_count_distinct(self):
+        rng = np.random.default_rng(2022)
+        for num_values in [1, 2, 5, 6, 100]:
+            values = rng.integers(num_values, size=10000)
+            for limit in [2, 5]:
+                self.assertEqual(
+                    count_distinct(values, limit),
+                    min(len(np.unique(values)), limit + 1),
+                )
+        # values first seen in later blocks are counted too
+        values = np.zeros(10000)
+        values[-3:] = [1, 2, 3]
+        self.assertEqual(count_distinct(values, 5, block_size=100), 4)
+        self.assertEqual(count_distinct(np.array(["a", "b", "a"], dtype=object), 5), 2)
+        self.assertEqual(count_distinct(np.array([]), 5), 0)
+
+
+class TestExactGroups(unittest.TestCase):
+    def test_exact_group_counts(self):
+        self.assertListEqual(
+            exact_group_counts([0.5, 0.3, 0.2], 1001).tolist(), [501, 300, 200]
+        )
+        self.assertListEqual(exact_group_counts([1 / 3] * 3, 10).tolist(), [4, 3, 3])
+        self.assertListEqual(exact_group_counts([0.5, 0.5], 0).tolist(), [0, 0])
+
+    def test_permutation_segments(self):
+        permutation = np.random.default_rng(2022).permutation(10)
+        groups, order, bounds = permutation_segments(permutation, np.array([4, 0, 6]))
+        self.assertListEqual(bounds.tolist(), [0, 4, 4, 10])
+        self.assertListEqual(sorted(order[:4]), order[:4].tolist())
+        self.assertListEqual(order[:4].tolist(), sorted(permutation[:4]))
+        self.assertTrue((groups[order[:4]] == 0).all() and (groups[order[4:]] == 2).all())
+
+    def test_weighted_choice_exact(self):
+        rng = np.random.default_rng(2022)
+        weights = np.array([0, 1, 1, 2, 4, 8], dtype=float)
+        counts = np.zeros(len(weights))
+        for _ in range(2000):
+            chosen = weighted_choice_exact(rng.random(len(weights)), weights, 2)
+            self.assertEqual(len(np.unique(chosen)), 2)
+            counts[chosen] += 1
+        # never chosen without weight, more often with more weight
+        self.assertEqual(counts[0], 0)
+        self.assertTrue((np.diff(counts[2:]) > 0).all())
+        # only items with weight can be chosen
+        self.assertListEqual(
+            sorted(weighted_choice_exact(rng.random(3), np.array([0, 1, 1.0]), 3)),
+            [1, 2],
+        )
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,257 @@
+import functools
+import numpy as np
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from pyampute.calibration import (
+    LOOKUP_TABLE_SEED,
+    SIGMOID_CUTOFFS,
+    check_shift_lookup_table,
+    custom_logits,
+    custom_shift_table,
+    function_fingerprint,
+    generate_shift_lookup_table,
+    histogram_logits,
+    load_shift_lookup_table,
+    lookup_table_path,
+    main,
+    sigmoid_logits,
+    solve_shift_grid,
+    solve_shifts,
+)
+from pyampute.utils import sigmoid
+
+
+class TestSolveShifts(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wss = np.random.default_rng(2022).standard_normal(100000)
+        return super().setUp()
+
+    def test_targets_reached(self):
+        for func in SIGMOID_CUTOFFS:
+            logits = sigmoid_logits(self.wss, func)
+            for target in [0.1, 0.3, 0.5, 0.9]:
+                shifts, iterations = solve_shifts(
+                    logits, [0, len(logits)], target, -3, 3, 100, 1e-3
+                )
+                probs = sigmoid(logits + shifts[0])
+                self.assertLess(abs(probs.mean() - target), 1e-3)
+                # far fewer evaluations than a binary search needs
+                self.assertLessEqual(iterations[0], 6)
+
+    def test_batch(self):
+        funcs = list(SIGMOID_CUTOFFS)
+        bounds = [0, 10000, 30000, 60000, 100000, 100000]
+        logits = np.empty(len(self.wss))
+        for group_idx, func in enumerate(funcs):
+            rows = slice(bounds[group_idx], bounds[group_idx + 1])
+            logits[rows] = sigmoid_logits(self.wss[rows], func)
+        targets = [0.1, 0.2, 0.3, 0.4]
+        shifts, _ = solve_shifts(logits, bounds, targets + [0.5], -3, 3, 100, 1e-4)
+        for group_idx, target in enumerate(targets):
+            rows = slice(bounds[group_idx], bounds[group_idx + 1])
+            probs = sigmoid(logits[rows] + shifts[group_idx])
+            self.assertLess(abs(probs.mean() - target), 1e-4)
+        # a group without rows keeps the middle of the range
+        self.assertEqual(shifts[-1], 0)
+
+        # float32 logits give the same shifts up to the tolerance
+        shifts32, _ = solve_shifts(
+            logits.astype(np.float32), bounds[:-1], targets, -3, 3, 100, 1e-4
+        )
+        self.assertTrue(np.allclose(shifts32, shifts[:-1], atol=1e-2))
+
+    def test_range(self):
+        # unreachable targets end at the bound of the range
+        logits = sigmoid_logits(self.wss, "SIGMOID-RIGHT")
+        shifts, iterations = solve_shifts(
+            logits, [0, len(logits)], 0.999, -3, 3, 30, 0.001
+        )
+        self.assertAlmostEqual(shifts[0], 3, places=3)
+        self.assertEqual(iterations[0], 29)
+
+    def test_initial_shifts(self):
+        # skewed scores, for which the shift for normal scores is a good start
+        wss = np.random.default_rng(2022).exponential(size=100000)
+        wss = (wss - wss.mean()) / wss.std()
+        logits = sigmoid_logits(wss, "SIGMOID-RIGHT")
+        table_shift = load_shift_lookup_table().shift("SIGMOID-RIGHT", 0.3)
+        shifts, iterations = solve_shifts(
+            logits, [0, len(logits)], 0.3, -3, 3, 100, 1e-4, None, [table_shift]
+        )
+        self.assertLess(abs(sigmoid(logits + shifts[0]).mean() - 0.3), 1e-4)
+        _, search_iterations = solve_shifts(
+            logits, [0, len(logits)], 0.3, -3, 3, 100, 1e-4
+        )
+        self.assertLess(iterations[0], search_iterations[0])
+
+        # the same for a sweep of targets
+        targets = [0.1, 0.3, 0.5]
+        table_shifts = [
+            load_shift_lookup_table().shift("SIGMOID-RIGHT", target)
+            for target in targets
+        ]
+        shifts = solve_shift_grid(
+            logits[None], targets, -3, 3, 100, 1e-4, None, None, [table_shifts]
+        )
+        self.assertLess(
+            np.absolute(sigmoid(logits[:, None] + shifts[0]).mean(axis=0) - targets).max(),
+            1e-4,
+        )
+
+    def test_histogram(self):
+        for func in SIGMOID_CUTOFFS:
+            logits = sigmoid_logits(self.wss, func)
+            bin_logits, counts = histogram_logits(logits, 64)
+            self.assertEqual(len(bin_logits), 64)
+            self.assertEqual(counts.sum(), len(logits))
+            shifts, _ = solve_shifts(
+                bin_logits, [0, 64], 0.3, -3, 3, 100, 1e-4, weights=counts
+            )
+            # the shift found on the histogram is as good on all logits
+            probs = sigmoid(logits + shifts[0])
+            self.assertLess(abs(probs.mean() - 0.3), 2e-4)
+
+
+class TestShiftLookupTable(unittest.TestCase):
+    def test_load(self):
+        table = load_shift_lookup_table()
+        # read once and shared
+        self.assertIs(load_shift_lookup_table(), table)
+        self.assertSetEqual(set(table.functions), set(SIGMOID_CUTOFFS))
+        self.assertEqual(table.shifts.shape, (len(table.functions), len(table.props)))
+        self.assertFalse(table.shifts.flags.writeable)
+        self.assertTrue(os.path.isfile(lookup_table_path()))
+
+    def test_interpolation(self):
+        table = load_shift_lookup_table()
+        shifts = table.shifts[table.functions.index("SIGMOID-RIGHT")]
+        prop_idx = np.searchsorted(table.props, 0.3)
+        self.assertEqual(table.shift("SIGMOID-RIGHT", 0.3), shifts[prop_idx])
+        self.assertAlmostEqual(
+            table.shift("SIGMOID-RIGHT", 0.3025),
+            0.75 * shifts[prop_idx] + 0.25 * shifts[prop_idx + 1],
+        )
+        # props between the grid points are met as well as on them
+        wss = np.random.default_rng(2022).standard_normal(100000)
+        logits = sigmoid_logits(wss, "SIGMOID-RIGHT")
+        for prop in [0.3025, 0.555]:
+            probs = sigmoid(logits + table.shift("SIGMOID-RIGHT", prop))
+            self.assertAlmostEqual(probs.mean(), prop, delta=0.002)
+
+    def test_generate(self):
+        table = generate_shift_lookup_table(0.1, 100000, seed=2022)
+        np.testing.assert_allclose(table.props, np.arange(1, 11) / 10)
+        # the same shifts as the packaged table, up to its tolerance
+        packaged = load_shift_lookup_table()
+        for func, shifts in zip(table.functions, table.shifts):
+            for prop, shift in zip(table.props, shifts):
+                self.assertAlmostEqual(shift, packaged.shift(func, prop), delta=0.02)
+        errors = check_shift_lookup_table(table, 100000, seed=2023)
+        self.assertLess(np.absolute(errors[:, 1:-1]).max(), 0.003)
+
+        # solving on the exact sample instead of its histogram
+        exact = generate_shift_lookup_table(0.1, 100000, seed=2022, bins=None)
+        np.testing.assert_allclose(exact.shifts, table.shifts, atol=1e-4)
+
+    def test_main(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "shift_lookup.npz")
+            args = ["--prop-step", "0.25", "--n-samples", "1000", "--output", path]
+            main(args + ["--check-samples", "0"])
+            with np.load(path) as table:
+                self.assertEqual(table["shifts"].shape, (4, 4))
+                # the default seed is fixed and recorded
+                self.assertEqual(int(table["seed"]), LOOKUP_TABLE_SEED)
+                shifts = table["shifts"]
+            main(args + ["--check-samples", "0"])
+            with np.load(path) as table:
+                self.assertTrue(np.array_equal(table["shifts"], shifts))
+
+            main(args + ["--check-samples", "0", "--upper-range", "1"])
+            with np.load(path) as table:
+                self.assertEqual(float(table["upper_range"]), 1)
+                self.assertLessEqual(table["shifts"].max(), 1)
+
+
+def scaled_sigmoid(X, scale=1.0):
+    return 0.5 * sigmoid(scale * X)
+
+
+SCALE = 1.0
+
+
+def globally_scaled_sigmoid(X):
+    return sigmoid(SCALE * X)
+
+
+class Cutoff:
+    """An object with the default repr, which holds a memory address."""
+
+    value = 0
+
+
+class TestCustomShiftTable(unittest.TestCase):
+    def test_fingerprint(self):
+        self.assertEqual(
+            function_fingerprint(lambda X: X > 0), function_fingerprint(lambda X: X > 0)
+        )
+        self.assertNotEqual(
+            function_fingerprint(lambda X: X > 0), function_fingerprint(lambda X: X > 1)
+        )
+        self.assertNotEqual(
+            function_fingerprint(functools.partial(scaled_sigmoid, scale=2)),
+            function_fingerprint(functools.partial(scaled_sigmoid, scale=3)),
+        )
+        threshold = 0.5
+        self.assertNotEqual(
+            function_fingerprint(lambda X: X > threshold),
+            function_fingerprint(lambda X: X > 0),
+        )
+
+        # the current values of referenced globals are part of the fingerprint
+        fingerprint = function_fingerprint(globally_scaled_sigmoid)
+        with mock.patch(f"{__name__}.SCALE", 2.0):
+            self.assertNotEqual(
+                function_fingerprint(globally_scaled_sigmoid), fingerprint
+            )
+        self.assertEqual(function_fingerprint(globally_scaled_sigmoid), fingerprint)
+
+    def test_disk_cache(self):
+        func = functools.partial(scaled_sigmoid, scale=2)
+        with tempfile.TemporaryDirectory() as directory, mock.patch.dict(
+            os.environ, {"PYAMPUTE_CACHE_DIR": directory}
+        ), mock.patch.dict("pyampute.calibration._custom_shift_tables", clear=True):
+            table = custom_shift_table(func, n_samples=10000)
+            self.assertEqual(len(os.listdir(directory)), 1)
+            # the shift gives the target proportion on normal scores
+            wss = np.random.default_rng(2022).standard_normal(100000)
+            probs = sigmoid(
+                custom_logits(func, wss) + table.shift(table.functions[0], 0.3)
+            )
+            self.assertAlmostEqual(probs.mean(), 0.3, delta=0.01)
+
+            # a new process reads the table from disk
+            from pyampute import calibration
+
+            calibration._custom_shift_tables.clear()
+            with mock.patch(
+                "pyampute.calibration.generate_shift_lookup_table"
+            ) as generate:
+                cached = custom_shift_table(func, n_samples=10000)
+            generate.assert_not_called()
+            np.testing.assert_array_equal(cached.shifts, table.shifts)
+
+            # functions without a stable fingerprint are only cached in memory
+            custom_shift_table(
+                lambda X, cutoff=Cutoff(): 0.2 * (X > cutoff.value) + 0.1,
+                n_samples=10000,
+            )
+            self.assertEqual(len(calibration._custom_shift_tables), 2)
+            self.assertEqual(len(os.listdir(directory)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
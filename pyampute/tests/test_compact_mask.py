@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import unittest
+
+from pyampute.compact_mask import CompactMask
+
+
+class TestCompactMask(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(2022)
+        # more than 8 columns, so rows span multiple bytes
+        self.mask = rng.random((1000, 11)) < 0.3
+        self.mask[:, 5] = False
+        self.compact = CompactMask.from_dense(self.mask)
+        return super().setUp()
+
+    def test_round_trip(self):
+        self.assertEqual(self.compact.shape, self.mask.shape)
+        self.assertEqual(self.compact.bits.shape, (1000, 2))
+        self.assertTrue(np.array_equal(self.compact.to_dense(), self.mask))
+        for idx in range(self.mask.shape[1]):
+            self.assertTrue(np.array_equal(self.compact.column(idx), self.mask[:, idx]))
+
+    def test_column_reductions(self):
+        self.assertTrue(
+            np.array_equal(self.compact.column_counts(), self.mask.sum(axis=0))
+        )
+        self.assertTrue(
+            np.allclose(self.compact.column_missing_rate(), self.mask.mean(axis=0))
+        )
+
+    def test_patterns(self):
+        for mask in [self.mask, self.mask[:, :4], np.tile(self.mask, 7)]:
+            with self.subTest(f"{mask.shape[1]} columns"):
+                codes, patterns = CompactMask.from_dense(mask).pattern_codes()
+                self.assertTrue(np.array_equal(patterns[codes], mask))
+                self.assertEqual(len(patterns), len(np.unique(mask, axis=0)))
+
+                patterns, counts = CompactMask.from_dense(mask).pattern_counts()
+                self.assertEqual(counts.sum(), mask.shape[0])
+
+    def test_set_operations(self):
+        other = np.roll(self.mask, 1, axis=0)
+        compact_other = CompactMask.from_dense(other)
+        self.assertTrue(
+            np.array_equal((self.compact | compact_other).to_dense(), self.mask | other)
+        )
+        self.assertTrue(
+            np.array_equal((self.compact & compact_other).to_dense(), self.mask & other)
+        )
+        with self.assertRaises(AssertionError):
+            self.compact | CompactMask.from_dense(self.mask[:10])
+
+    def test_apply(self):
+        X = np.random.randn(*self.mask.shape)
+        X_incomplete = self.compact.apply(X, block_size=100)
+        self.assertTrue(np.array_equal(np.isnan(X_incomplete), self.mask))
+        self.assertFalse(np.isnan(X).any())
+
+        self.compact.apply(X, copy=False)
+        self.assertTrue(np.array_equal(np.isnan(X), self.mask))
+
+        X_df = pd.DataFrame(np.random.randn(*self.mask.shape))
+        self.assertTrue(
+            np.array_equal(self.compact.apply(X_df).isnull().values, self.mask)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -37,7 +37,7 @@ class TestDefaults(unittest.TestCase):
         super().setUp()
 
     def test_minimal_defaults(self):
-        minimal = MultivariateAmputation(seed=4)
+        minimal = MultivariateAmputation(seed=3)
         minimal.fit(X_nomissing)
         self.assertTrue(np.array_equal(minimal.freqs, np.array([1]),))
         self.assertTrue(np.array_equal(minimal.mechanisms, np.array(["MAR"])))
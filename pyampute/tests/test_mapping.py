@@ -101,7 +101,9 @@ class TestMapping(unittest.TestCase):
             ]
         )
 
-        nhanes2_incomplete = ma.fit_transform(self.nhanes2_sim)
+        nhanes2_incomplete, diagnostics = ma.fit(self.nhanes2_sim).transform(
+            self.nhanes2_sim, return_diagnostics=True
+        )
 
         mdp = mdPatterns()
         mypatterns = mdp.get_patterns(nhanes2_incomplete, show_plot=False)
@@ -111,7 +113,7 @@ class TestMapping(unittest.TestCase):
             [[0, 4, 1, 0], [1, 1, 0, 1], [0, 1, 1, 0], [-2, 0, 0, 1]]
         )
 
-        self.assertTrue(len(ma.wss_per_pattern), 4)
+        self.assertTrue(len(diagnostics.wss_per_pattern), 4)
 
 
 if __name__ == "__main__":
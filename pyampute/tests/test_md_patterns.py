@@ -4,6 +4,7 @@ import unittest
 
 from pyampute.exploration.md_patterns import mdPatterns
 from pyampute.ampute import MultivariateAmputation
+from pyampute.compact_mask import CompactMask
 
 
 class TestMdPatterns(unittest.TestCase):
@@ -52,8 +53,8 @@ class TestMdPatterns(unittest.TestCase):
         self.assertEqual(patterns.shape, (3, 4))
         self.assertEqual(patterns.loc["rows_no_missing"].values[1:-1].sum(), 2)
         self.assertEqual(patterns.loc["rows_no_missing", "n_missing_values"], 0)
-        self.assertEqual(patterns.loc["rows_no_missing", "row_count"], 489)
-        self.assertEqual(patterns.loc[1, "row_count"], 511)
+        self.assertEqual(patterns.loc["rows_no_missing", "row_count"], 483)
+        self.assertEqual(patterns.loc[1, "row_count"], 517)
 
         # self.assertEqual(patterns.iloc[0, 1:-1].sum(), 2)
         # self.assertEqual(patterns.iloc[0, -1], 0)
@@ -70,6 +71,19 @@ class TestMdPatterns(unittest.TestCase):
             patterns.iloc[1:-1, 1:-1].values.tolist(),
             [[1, 1, 1, 0], [1, 1, 0, 1], [1, 0, 0, 1], [1, 0, 0, 0]])
 
+    def test_compact_mask(self):
+
+        mdp = mdPatterns()
+        patterns = mdp.get_patterns(self.nhanes2, show_plot=False)
+        compact_patterns = mdp.get_patterns(
+            CompactMask.from_dense(self.nhanes2.isnull()), show_plot=False
+        )
+
+        self.assertEqual(compact_patterns.shape, patterns.shape)
+        self.assertListEqual(
+            compact_patterns.values.tolist(), patterns.values.tolist()
+        )
+
     def test_proportions(self):
 
         mdp = mdPatterns()
@@ -1,17 +1,19 @@
 """ Utils mainly to write code agnostic to numpy or pandas.  """
 # Author: Davina Zamanzadeh <davzaman@gmail.com>
 
-from typing import List, Optional, Union
+from typing import Callable, List, Optional, Sequence, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from os import cpu_count
 import pandas as pd
 from pandas.api.types import is_numeric_dtype
 import numpy as np
 from os import getcwd
-from os.path import join
 
 ArrayLike = Union[pd.Series, np.array, List]
 Matrix = Union[pd.DataFrame, np.ndarray]
 
-LOOKUP_TABLE_PATH = join("data", "shift_lookup.csv")
+# rows per block of work, independent of the number of workers
+ROW_BLOCK_SIZE = 65536
 
 
 def standardize_uppercase(input: str) -> str:
@@ -40,9 +42,13 @@ def enforce_numeric(
     X: Union[ArrayLike, Matrix], vars_to_enforce: Optional[List[Union[str, int]]] = None
 ) -> Matrix:
     if isinstance(X, np.ndarray):
-        X = np.array(list(map(pd.to_numeric, X)))
-        all_nan_cols = np.isnan(X).all(axis=0)
-        X = X[:, ~all_nan_cols]
+        if not is_numeric_dtype(X.dtype):
+            # one vectorized conversion per column instead of one per row
+            X = np.column_stack([pd.to_numeric(col) for col in X.T])
+        # only columns that start with NaN can be all NaN
+        if np.issubdtype(X.dtype, np.floating) and len(X) > 0 and np.isnan(X[0]).any():
+            all_nan_cols = np.isnan(X).all(axis=0)
+            X = X[:, ~all_nan_cols]
     else:  # pd_df, or native python array
         # enforce pd df if native python list
         X = pd.DataFrame(X)
@@ -56,3 +62,292 @@ def enforce_numeric(
             X = X.apply(pd.to_numeric, errors="coerce").dropna(axis=1, how="all")
 
     return X
+
+
+def numeric_coercion_plan(dtypes: Sequence[np.dtype]) -> np.ndarray:
+    """
+    Boolean array that is True for every column (given by its dtype) that is
+    not numeric and has to be converted with ``pd.to_numeric``.
+    """
+    return np.array([not is_numeric_dtype(dtype) for dtype in dtypes], dtype=bool)
+
+
+def coerce_numeric(
+    X: Matrix, plan: Optional[np.ndarray] = None, dtype: type = np.float64
+) -> np.ndarray:
+    """
+    Converts X to a numeric array of type ``dtype`` column by column. Only
+    the columns flagged in the coercion ``plan`` (by default derived from the
+    dtypes of X) are parsed, with one vectorized ``pd.to_numeric`` call each.
+    If there are none, numeric data is passed through without a copy where
+    possible.
+    """
+    if plan is None:
+        plan = numeric_coercion_plan(
+            X.dtypes if isinstance(X, pd.DataFrame) else [X.dtype] * X.shape[1]
+        )
+    if not plan.any():
+        return np.asarray(X, dtype=dtype)
+    numeric = np.empty(X.shape, dtype=dtype)
+    for idx in range(X.shape[1]):
+        column = X.iloc[:, idx] if isinstance(X, pd.DataFrame) else X[:, idx]
+        numeric[:, idx] = pd.to_numeric(column) if plan[idx] else column
+    return numeric
+
+
+def count_distinct(values: np.ndarray, limit: int, block_size: int = 4096) -> int:
+    """
+    Number of distinct values, counted up to ``limit + 1``. Stops as soon as
+    more than ``limit`` distinct values are found, so data with many distinct
+    values is decided on its first block instead of sorting all of it. Data
+    with few distinct values is scanned once, comparing against the (at most
+    ``limit``) values seen so far.
+    """
+    distinct = values[:0]
+    for start in range(0, len(values), block_size):
+        block = values[start : start + block_size]
+        unseen = block[~np.isin(block, distinct)]
+        if len(unseen) > 0:
+            distinct = np.union1d(distinct, unseen)
+            if len(distinct) > limit:
+                return limit + 1
+    return len(distinct)
+
+
+def group_segments(groups: np.ndarray, num_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Sorts row indices by group (stable, so rows keep their original order
+    within a group) and returns them together with the segment boundaries.
+    Rows of group ``g`` are ``order[bounds[g]:bounds[g + 1]]``.
+    """
+    # small integer types are sorted with a linear-time radix sort
+    if num_groups <= np.iinfo(np.uint16).max:
+        groups = groups.astype(np.uint16)
+    order = np.argsort(groups, kind="stable")
+    bounds = np.concatenate(([0], np.cumsum(np.bincount(groups, minlength=num_groups))))
+    return order, bounds
+
+
+def exact_group_counts(freqs: ArrayLike, num_rows: int) -> np.ndarray:
+    """
+    Numbers of rows per group that sum to ``num_rows`` and are as close as
+    possible to ``freqs * num_rows``: the floors, plus one row for the groups
+    with the largest remainders (earlier groups first on ties).
+    """
+    freqs = np.asarray(freqs, dtype=float)
+    expected = freqs / freqs.sum() * num_rows
+    counts = np.floor(expected).astype(int)
+    num_left = num_rows - counts.sum()
+    counts[np.argsort(counts - expected, kind="stable")[:num_left]] += 1
+    return counts
+
+
+def permutation_segments(
+    permutation: np.ndarray, counts: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Splits a permutation of the row indices into consecutive groups of
+    ``counts`` rows. Returns the group of every row together with the row
+    order and segment bounds as ``group_segments`` would. The groups are
+    put back in row order with a stable sort of 16-bit group labels, which
+    numpy does as a radix sort, so this takes linear time for up to 65536
+    groups (and `O(n log n)` beyond).
+    """
+    bounds = np.concatenate(([0], np.cumsum(counts)))
+    groups = np.empty(len(permutation), dtype=int)
+    groups[permutation] = np.repeat(np.arange(len(counts)), counts)
+    labels = groups.astype(np.uint16) if len(counts) <= 2 ** 16 else groups
+    order = np.argsort(labels, kind="stable")
+    return groups, order, bounds
+
+
+def weighted_choice_exact(
+    uniforms: np.ndarray, weights: np.ndarray, num_chosen: int
+) -> np.ndarray:
+    """
+    Indices of ``num_chosen`` items sampled without replacement with
+    probability proportional to ``weights``, given a uniform draw per item.
+    These are the items with the smallest exponential keys ``E / weight``
+    (Efraimidis & Spirakis), selected in linear time with ``argpartition``.
+    Items with weight 0 are never chosen, so fewer items may be returned.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        keys = -np.log1p(-uniforms) / weights
+    num_chosen = min(num_chosen, np.count_nonzero(weights > 0))
+    if num_chosen <= 0:
+        return np.empty(0, dtype=int)
+    if num_chosen == len(keys):
+        return np.arange(len(keys))
+    return np.argpartition(keys, num_chosen - 1)[:num_chosen]
+
+
+def grouped_mean_std(
+    X: np.ndarray, groups: np.ndarray, num_groups: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Segmented mean and (population) standard deviation of ``X`` per group,
+    computed in one pass over the rows per column with ``np.bincount``.
+    ``X`` can be of shape `(n,)` or `(n, m)`; the result is of shape `(k,)` or
+    `(k, m)` respectively. Empty groups get mean 0 and std 0.
+    """
+    values = X[:, None] if X.ndim == 1 else X
+    counts = np.bincount(groups, minlength=num_groups)
+    safe_counts = np.maximum(counts, 1)[:, None]
+    means = np.empty((num_groups, values.shape[1]))
+    variances = np.empty((num_groups, values.shape[1]))
+    for j in range(values.shape[1]):
+        col = values[:, j]
+        means[:, j] = np.bincount(groups, weights=col, minlength=num_groups)
+        means[:, j] /= safe_counts[:, 0]
+        # two-pass variance for numerical stability
+        deviations = col - means[groups, j]
+        variances[:, j] = np.bincount(
+            groups, weights=deviations * deviations, minlength=num_groups
+        )
+    stds = np.sqrt(variances / safe_counts)
+    if X.ndim == 1:
+        return means[:, 0], stds[:, 0]
+    return means, stds
+
+
+def grouped_rowwise_dot(
+    X: np.ndarray, weights: np.ndarray, groups: np.ndarray, block_size: int = 65536
+) -> np.ndarray:
+    """
+    Computes ``X[i] @ weights[groups[i]]`` for every row ``i`` in blocks of
+    rows, so the memory overhead is bounded by ``block_size``.
+    """
+    out = np.empty(X.shape[0], dtype=np.result_type(X, weights))
+    for start in range(0, X.shape[0], block_size):
+        stop = start + block_size
+        np.einsum(
+            "ij,ij->i", X[start:stop], weights[groups[start:stop]], out=out[start:stop]
+        )
+    return out
+
+
+def effective_n_jobs(n_jobs: Optional[int]) -> int:
+    """
+    Number of workers for ``n_jobs``, following the scikit-learn convention:
+    None means 1 and negative values count back from the number of CPUs
+    (-1 uses all of them).
+    """
+    assert n_jobs != 0, "n_jobs cannot be 0."
+    if n_jobs is None:
+        return 1
+    if n_jobs < 0:
+        return max(cpu_count() + 1 + n_jobs, 1)
+    return n_jobs
+
+
+def map_row_blocks(
+    func: Callable[[slice], None],
+    num_rows: int,
+    n_jobs: Optional[int] = None,
+    block_size: int = ROW_BLOCK_SIZE,
+):
+    """
+    Calls ``func(rows)`` for consecutive slices of (at most) ``block_size``
+    rows, spread over ``n_jobs`` threads. ``func`` writes its results into
+    arrays shared by all threads, so no data is copied between workers.
+    Because the blocks do not depend on ``n_jobs``, neither do the results.
+    """
+    blocks = [
+        slice(start, min(start + block_size, num_rows))
+        for start in range(0, num_rows, block_size)
+    ]
+    num_workers = min(effective_n_jobs(n_jobs), len(blocks))
+    if num_workers <= 1:
+        for rows in blocks:
+            func(rows)
+        return
+    with ThreadPoolExecutor(max_workers=num_workers) as pool:
+        # consume the results so exceptions of workers are raised here
+        list(pool.map(func, blocks))
+
+
+class DataSketch:
+    """
+    Bounded-memory summary of a stream of numeric data batches: running
+    column means and variances (batches are merged with the parallel form of
+    Welford's algorithm) and a uniform reservoir sample of at most
+    ``sample_size`` rows. The sums and cross products of the sampled rows
+    (about a fixed center, against cancellation) are kept up to date with
+    every row that enters or leaves the sample, and ``changes`` counts these
+    replacements.
+    """
+
+    def __init__(
+        self, num_columns: int, sample_size: int, rng: np.random.Generator
+    ) -> None:
+        self.count = 0
+        self.mean = np.zeros(num_columns)
+        self.m2 = np.zeros(num_columns)
+        self.sample_size = sample_size
+        self.rng = rng
+        self._sample = np.empty((sample_size, num_columns))
+        self.changes = 0
+        self._center = None
+        self._sample_sum = np.zeros(num_columns)
+        self._sample_cross = np.zeros((num_columns, num_columns))
+
+    @property
+    def std(self) -> np.ndarray:
+        """Population standard deviation per column."""
+        return np.sqrt(self.m2 / max(self.count, 1))
+
+    @property
+    def sample(self) -> np.ndarray:
+        """Uniform sample (without replacement) of the rows seen so far."""
+        return self._sample[: min(self.count, self.sample_size)]
+
+    @property
+    def sample_mean(self) -> np.ndarray:
+        """Column means of the sample."""
+        num_sampled = max(len(self.sample), 1)
+        return self._center + self._sample_sum / num_sampled
+
+    @property
+    def sample_cov(self) -> np.ndarray:
+        """Population covariance matrix of the columns of the sample."""
+        num_sampled = max(len(self.sample), 1)
+        centered_mean = self._sample_sum / num_sampled
+        return self._sample_cross / num_sampled - np.outer(centered_mean, centered_mean)
+
+    def _add_to_sample_moments(self, rows: np.ndarray, sign: int) -> None:
+        centered = rows - self._center
+        self._sample_sum += sign * centered.sum(axis=0)
+        self._sample_cross += sign * (centered.T @ centered)
+
+    def update(self, X: np.ndarray) -> None:
+        """Adds a batch of rows of shape `(b, num_columns)`."""
+        num_rows = X.shape[0]
+        if num_rows == 0:
+            return
+
+        batch_mean = X.mean(axis=0)
+        if self._center is None:
+            self._center = batch_mean
+        batch_m2 = ((X - batch_mean) ** 2).sum(axis=0)
+        delta = batch_mean - self.mean
+        total = self.count + num_rows
+        self.mean = self.mean + delta * num_rows / total
+        self.m2 = self.m2 + batch_m2 + delta ** 2 * self.count * num_rows / total
+
+        # reservoir sampling (algorithm R), vectorized over the batch
+        num_fill = min(max(self.sample_size - self.count, 0), num_rows)
+        self._sample[self.count : self.count + num_fill] = X[:num_fill]
+        self._add_to_sample_moments(X[:num_fill], 1)
+        positions = self.count + np.arange(num_fill, num_rows)
+        slots = self.rng.integers(0, positions + 1)
+        replaces = slots < self.sample_size
+        slots, rows = slots[replaces], X[num_fill:][replaces]
+        # when rows compete for the same slot, the last one wins
+        _, last_from_end = np.unique(slots[::-1], return_index=True)
+        winners = len(slots) - 1 - last_from_end
+        self._add_to_sample_moments(self._sample[slots[winners]], -1)
+        self._add_to_sample_moments(rows[winners], 1)
+        self._sample[slots[winners]] = rows[winners]
+        self.changes += num_fill + len(winners)
+
+        self.count = total
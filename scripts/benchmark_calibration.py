@@ -0,0 +1,105 @@
+"""
+Benchmarks the batched shift solver against the per-pattern bisection it
+replaced, and against solving on histograms of the logits, on patterns of
+standardized weighted sum scores of n rows each. Compares the missingness
+proportions the shifts give on all rows.
+
+Run from the root folder, e.g. ``python scripts/benchmark_calibration.py``.
+"""
+import argparse
+from time import perf_counter
+
+import numpy as np
+
+from pyampute.ampute import MultivariateAmputation
+from pyampute.calibration import (
+    SIGMOID_CUTOFFS,
+    histogram_logits,
+    sigmoid_logits,
+    solve_shifts,
+)
+from pyampute.utils import sigmoid
+
+DEFAULTS = MultivariateAmputation.DEFAULTS
+
+
+def bisection(wss_standardized: np.ndarray, func: str, prop: float) -> float:
+    """The original search: the mean of a new probability array per step."""
+    lower_range, upper_range = DEFAULTS["lower_range"], DEFAULTS["upper_range"]
+    b = 0
+    for counter in range(1, DEFAULTS["max_iter"] + 1):
+        b = lower_range + (upper_range - lower_range) / 2
+        if counter == DEFAULTS["max_iter"]:
+            break
+        current_prop = np.mean(
+            MultivariateAmputation._shifted_probability_func(wss_standardized, b, func)
+        )
+        if np.absolute(current_prop - prop) < DEFAULTS["max_diff_with_target"]:
+            break
+        if current_prop > prop:
+            upper_range = b
+        else:
+            lower_range = b
+    return b
+
+
+def batched(wss: np.ndarray, funcs: list, prop: float, bins: int = None) -> np.ndarray:
+    logits = [sigmoid_logits(wss[idx], func) for idx, func in enumerate(funcs)]
+    weights = None
+    if bins is not None:
+        logits, weights = zip(*[histogram_logits(group, bins) for group in logits])
+        weights = np.concatenate(weights)
+    logits = np.concatenate(logits)
+    return solve_shifts(
+        logits,
+        np.arange(len(funcs) + 1) * (len(logits) // len(funcs)),
+        prop,
+        DEFAULTS["lower_range"],
+        DEFAULTS["upper_range"],
+        DEFAULTS["max_iter"],
+        DEFAULTS["max_diff_with_target"],
+        weights,
+    )[0]
+
+
+def benchmark(
+    n: int, k: int, prop: float, bins: int, repeats: int = 3, seed: int = 2022
+):
+    wss = np.random.default_rng(seed).standard_normal((k, n))
+    funcs = [list(SIGMOID_CUTOFFS)[idx % len(SIGMOID_CUTOFFS)] for idx in range(k)]
+
+    print(f"n={n} rows per pattern, k={k} patterns, prop={prop}")
+    for name, solve in [
+        (
+            "bisection",
+            lambda: np.array(
+                [bisection(wss[idx], func, prop) for idx, func in enumerate(funcs)]
+            ),
+        ),
+        ("batched solver", lambda: batched(wss, funcs, prop)),
+        (f"{bins} bins", lambda: batched(wss, funcs, prop, bins)),
+    ]:
+        timings = []
+        for _ in range(repeats):
+            start = perf_counter()
+            shifts = solve()
+            timings.append(perf_counter() - start)
+        reached = [
+            sigmoid(sigmoid_logits(wss[idx], func) + shifts[idx]).mean()
+            for idx, func in enumerate(funcs)
+        ]
+        print(
+            f"  {name:>16}: {min(timings):8.3f}s, "
+            f"max error: {np.max(np.absolute(np.array(reached) - prop)):.5f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1_000_000)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--prop", type=float, default=0.3)
+    parser.add_argument("--bins", type=int, default=1024)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+    benchmark(args.n, args.k, args.prop, args.bins, args.repeats)
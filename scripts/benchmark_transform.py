@@ -0,0 +1,114 @@
+"""
+Benchmarks ``MultivariateAmputation.transform`` against the per-pattern loop
+it replaced, and compares the missingness both produce.
+
+Run from the root folder, e.g. ``python scripts/benchmark_transform.py``.
+"""
+import argparse
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+from pyampute.ampute import MultivariateAmputation
+
+
+def original_enforce_numeric(X: np.ndarray) -> np.ndarray:
+    """
+    ``pyampute.utils.enforce_numeric`` as the original transform called it
+    on arrays, before it was rewritten to use ``coerce_numeric``.
+    """
+    X = np.array(list(map(pd.to_numeric, X)))
+    all_nan_cols = np.isnan(X).all(axis=0)
+    return X[:, ~all_nan_cols]
+
+
+def per_pattern_transform(ma: MultivariateAmputation, X: np.ndarray) -> np.ndarray:
+    """The original transform: one subset, standardization and draw per pattern."""
+    X = ma._validate_data(X)
+    X_incomplete = X.copy()
+    X_indices = np.arange(X.shape[0])
+    np.random.seed(ma.seed)
+    assigned_group_number = np.random.choice(
+        a=ma.num_patterns, size=X.shape[0], p=ma.freqs
+    )
+    for pattern_idx in range(ma.num_patterns):
+        group_indices = X_indices[assigned_group_number == pattern_idx]
+        data_group = original_enforce_numeric(X[group_indices])
+        if ma.std:
+            data_group = stats.zscore(data_group)
+        wss = np.dot(data_group, ma.weights[pattern_idx, :].T)
+        func = ma.score_to_probability_func[pattern_idx]
+        if len(np.unique(wss)) <= 5:
+            probs = np.repeat(ma.prop, len(wss))
+        elif isinstance(func, str):
+            wss_standardized = stats.zscore(wss)
+            shift = ma._calculate_shift(
+                wss_standardized,
+                func,
+                ma.prop,
+                ma.lower_range,
+                ma.upper_range,
+                ma.max_iter,
+                ma.max_diff_with_target,
+            )
+            probs = ma._shifted_probability_func(wss_standardized, shift, func)
+        else:
+            probs = func(stats.zscore(wss))
+        np.random.seed(ma.seed)
+        chosen_candidates = np.random.binomial(n=1, size=len(wss), p=probs)
+        chosen_indices = group_indices[chosen_candidates == 1]
+        pattern = ma.observed_var_indicator[pattern_idx]
+        X_incomplete[chosen_indices] = np.where(
+            pattern == 0, np.nan, X_incomplete[chosen_indices]
+        )
+    return X_incomplete
+
+
+def benchmark(
+    n: int, m: int, k: int, repeats: int = 3, seed: int = 2022, n_jobs: int = None
+):
+    rng = np.random.default_rng(seed)
+    X = rng.standard_normal((n, m))
+    mechanisms = ["MAR", "MNAR", "MCAR"]
+    patterns = [
+        {
+            "incomplete_vars": [i % m, (i + 1) % m],
+            "mechanism": mechanisms[i % len(mechanisms)],
+        }
+        for i in range(k)
+    ]
+    ma = MultivariateAmputation(
+        patterns=patterns, prop=0.4, seed=seed, n_jobs=n_jobs
+    ).fit(X)
+
+    results = {}
+    for name, transform in [
+        ("per-pattern loop", lambda: per_pattern_transform(ma, X)),
+        ("single pass", lambda: ma.transform(X)),
+    ]:
+        timings = []
+        for _ in range(repeats):
+            start = perf_counter()
+            X_incomplete = transform()
+            timings.append(perf_counter() - start)
+        results[name] = (min(timings), np.isnan(X_incomplete).mean(axis=0))
+
+    print(f"n={n}, m={m}, k={k}, n_jobs={n_jobs}")
+    for name, (timing, missing_per_col) in results.items():
+        print(
+            f"  {name:>16}: {timing:8.3f}s, "
+            f"missing per column: {np.round(missing_per_col, 3)}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=1_000_000)
+    parser.add_argument("-m", type=int, default=10)
+    parser.add_argument("-k", type=int, default=24)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--n-jobs", type=int, default=None)
+    args = parser.parse_args()
+    benchmark(args.n, args.m, args.k, args.repeats, n_jobs=args.n_jobs)
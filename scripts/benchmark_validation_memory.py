@@ -0,0 +1,81 @@
+"""
+Measures the peak memory of validating and masking a wide, mixed-dtype
+DataFrame where only a few numeric columns are involved in amputation, and
+compares it with materializing the whole frame through ``DataFrame.values``.
+Validation of the data passed to ``fit`` takes a fast path, recognized by its
+fingerprint, so it is measured separately from the full validation of unseen
+data.
+
+Run from the root folder, e.g. ``python scripts/benchmark_validation_memory.py``.
+"""
+import argparse
+import tracemalloc
+from typing import Callable
+
+import numpy as np
+import pandas as pd
+
+from pyampute.ampute import MultivariateAmputation
+
+
+def mixed_dtype_frame(
+    n: int, num_numeric: int, num_strings: int, num_categoricals: int, seed: int
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    words = np.array([f"word_{idx}" for idx in range(1000)], dtype=object)
+    columns = {f"num_{idx}": rng.standard_normal(n) for idx in range(num_numeric)}
+    columns.update(
+        {f"str_{idx}": rng.choice(words, n) for idx in range(num_strings)}
+    )
+    columns.update(
+        {
+            f"cat_{idx}": pd.Categorical(rng.choice(words[:10], n))
+            for idx in range(num_categoricals)
+        }
+    )
+    return pd.DataFrame(columns)
+
+
+def peak_memory(func: Callable[[], object]) -> float:
+    """Peak memory allocated while running func, in MB."""
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def benchmark(
+    n: int, num_numeric: int, num_strings: int, num_categoricals: int, seed: int = 2022
+):
+    X = mixed_dtype_frame(n, num_numeric, num_strings, num_categoricals, seed)
+    ma = MultivariateAmputation(
+        patterns=[
+            {"incomplete_vars": [0], "weights": {1: 1, 2: 1}},
+            {"incomplete_vars": [1], "mechanism": "MNAR"},
+        ],
+        seed=seed,
+    ).fit(X)
+    # same frame with one involved value changed, so it is validated in full
+    X_unseen = X.copy()
+    X_unseen.iloc[0, 0] += 1
+
+    print(f"n={n}, {num_numeric} numeric, {num_strings} string, "
+          f"{num_categoricals} categorical columns")
+    for name, func in [
+        ("DataFrame.values", lambda: X.values),
+        ("validation (fit X)", lambda: ma._validate_data(X)),
+        ("validation (unseen)", lambda: ma._validate_data(X_unseen)),
+        ("transform_mask (unseen)", lambda: ma.transform_mask(X_unseen, packed=True)),
+    ]:
+        print(f"  {name:>23}: peak {peak_memory(func):8.1f} MB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("-n", type=int, default=200_000)
+    parser.add_argument("--numeric", type=int, default=4)
+    parser.add_argument("--strings", type=int, default=40)
+    parser.add_argument("--categoricals", type=int, default=10)
+    args = parser.parse_args()
+    benchmark(args.n, args.numeric, args.strings, args.categoricals)
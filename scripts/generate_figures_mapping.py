@@ -38,24 +38,26 @@ def generate_figures_mapping():
             },
         ]
     )
-    incompl_dataset = ma.fit_transform(compl_dataset)
+    incompl_dataset, diagnostics = ma.fit(compl_dataset).transform(
+        compl_dataset, return_diagnostics=True
+    )
 
     std_data = stats.zscore(compl_dataset)
     is_incomplete = np.where(np.isnan(incompl_dataset), "incompl", "compl")
 
     df0 = pd.DataFrame(
         dict(
-            x=std_data[ma.assigned_group_number == 0, 1],
-            y=ma.wss_per_pattern[0],
-            label=is_incomplete[ma.assigned_group_number == 0, 3],
+            x=std_data[diagnostics.assigned_group_number == 0, 1],
+            y=diagnostics.wss_per_pattern[0],
+            label=is_incomplete[diagnostics.assigned_group_number == 0, 3],
         )
     )
 
     df3 = pd.DataFrame(
         dict(
-            x=std_data[ma.assigned_group_number == 3, 0],
-            y=ma.wss_per_pattern[3],
-            label=is_incomplete[ma.assigned_group_number == 3, 1],
+            x=std_data[diagnostics.assigned_group_number == 3, 0],
+            y=diagnostics.wss_per_pattern[3],
+            label=is_incomplete[diagnostics.assigned_group_number == 3, 1],
         )
     )
 
@@ -12,6 +12,12 @@ setup(
         include=["pyampute.*", "pyampute"],
         exclude=["*.tests", "*.tests.*", "tests.*", "tests"],
     ),
+    package_data={"pyampute": ["data/*.npz"]},
+    entry_points={
+        "console_scripts": [
+            "pyampute-shift-lookup-table=pyampute.calibration:main",
+        ]
+    },
     install_requires=[
         # "rich",  # nice stack traces + printing
         "pandas",